@@ -0,0 +1,36 @@
+import unittest
+import copy
+import pickle
+from demystify.base import Var, Lit
+
+class LitTester(unittest.TestCase):
+    def test_interned(self):
+        x = Var("x", [1, 2], None)
+        l = Lit(x, 1, True)
+        self.assertIs(l, Lit(x, 1, True))
+        self.assertIs(l.neg().neg(), l)
+        self.assertIs(copy.deepcopy(l), l)
+        copied = pickle.loads(pickle.dumps(l))
+        self.assertEqual(copied, l)
+        self.assertIs(Lit(copied.var, 1, False), copied.neg())
+
+    def test_var_kept(self):
+        # A Var with the same name, but a different domain and location,
+        # gets its own Lit, which is equal to the old one
+        x = Var("x", [1, 2], None)
+        l = Lit(x, 1, True)
+        y = Var("x", [1, 2, 3], (0, 1))
+        m = Lit(y, 1, True)
+        self.assertIs(m.var, y)
+        self.assertEqual(m.var.dom(), [1, 2, 3])
+        self.assertEqual(m, l)
+        self.assertEqual(hash(m), hash(l))
+
+    def test_order(self):
+        x = Var("x", [1, 2], None)
+        y = Var("y", [1, 2], None)
+        lits = [Lit(y, 1, True), Lit(x, 2, True), Lit(x, 1, True), Lit(x, 1, False)]
+        self.assertEqual(
+            sorted(lits),
+            [Lit(x, 1, False), Lit(x, 1, True), Lit(x, 2, True), Lit(y, 1, True)],
+        )
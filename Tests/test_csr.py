@@ -0,0 +1,18 @@
+import unittest
+import numpy
+from demystify.utils import buildcsr, csrgather, csrunion
+
+class CSRTester(unittest.TestCase):
+    def test_gather(self):
+        (indptr, indices) = buildcsr([2, 0, 2, 0, 3], [5, 6, 7, 8, 9], 4)
+        self.assertEqual(list(indptr), [0, 2, 2, 4, 5])
+        self.assertEqual(list(indices), [6, 8, 5, 7, 9])
+        rows = numpy.array([3, 1, 0])
+        self.assertEqual(list(csrgather(indptr, indices, rows)), [9, 6, 8])
+        self.assertEqual(len(csrgather(indptr, indices, numpy.array([1]))), 0)
+
+    def test_union(self):
+        (indptr, indices) = buildcsr([0, 0, 1, 1, 2], [4, 1, 1, 3, 4], 3)
+        rows = numpy.array([2, 0, 1])
+        self.assertEqual(list(csrunion(indptr, indices, rows, 5)), [1, 3, 4])
+        self.assertEqual(len(csrunion(indptr, indices, numpy.array([], dtype=int), 5)), 0)
@@ -0,0 +1,69 @@
+import unittest
+import numpy
+from pysat.formula import CNF
+from demystify.base import VarMatrix, Puzzle, EqVal
+from demystify.buildpuz import buildNeq
+from demystify.internal import Solver
+from demystify.config import EXPCONFIG
+from demystify.utils import randomFromSeed
+
+def buildPuzzle():
+    varmat = VarMatrix(lambda t: "x{}".format(t[1]), (1, 3), [1, 2, 3])
+    puzzle = Puzzle([varmat])
+    (x0, x1, x2) = varmat.varlist()
+    puzzle.addConstraints(buildNeq("different", x0, x1, [1, 2, 3]))
+    return puzzle
+
+# How var_smt2lits used to decode a model, one SAT variable at a time,
+# with the model as a dict from SAT variables to their values
+def oldDecode(solver, model):
+    model = {v: model[v] > 0 for v in range(len(model)) if model[v] != 0}
+    ret = []
+    for l in solver._varsmt:
+        if l in model:
+            if model[l]:
+                ret.extend(solver._varsmt2litmap[l])
+            else:
+                ret.extend(solver._varsmt2neglitmap[l])
+    return ret
+
+# Check var_smt2lits against oldDecode on random models (1 is true, -1 is
+# false, 0 is unassigned), including models too short to hold every
+# variable solver decodes
+def checkDecode(test, solver, maxvar):
+    r = randomFromSeed(1)
+    for length in range(maxvar + 3):
+        for _ in range(20):
+            model = r.randint(-1, 2, size=length).astype(numpy.int8)
+            test.assertEqual(solver.var_smt2lits(model), oldDecode(solver, model))
+
+class SolverTester(unittest.TestCase):
+    def test_decode(self):
+        solver = Solver(buildPuzzle())
+        checkDecode(self, solver, max(solver._varsmt))
+        # A real model sets every variable, so gives one literal for each
+        model = solver._solver.solve([], getsol=True)
+        self.assertEqual(len(solver.var_smt2lits(model)), 9)
+        self.assertEqual(solver.var_smt2lits(model), oldDecode(solver, model))
+
+    def test_decode_cnf(self):
+        varmat = VarMatrix(lambda t: "y{}".format(t[1]), (1, 2), [1, 2])
+        (y0, y1) = varmat.varlist()
+        # Each SAT variable stands for two literals, and some of them are
+        # true when it is false
+        litmap = {EqVal(y0, 1): 2, EqVal(y0, 2): -2, EqVal(y1, 1): -5, EqVal(y1, 2): 5}
+        solver = Solver(
+            Puzzle([varmat]), cnf=CNF(from_clauses=[[2, 5]]), litmap=litmap, conmap={}
+        )
+        model = numpy.array([0, 0, -1, 0, 0, 1], dtype=numpy.int8)
+        self.assertEqual(
+            sorted(map(str, solver.var_smt2lits(model))),
+            ["y0 is 2", "y0 is not 1", "y1 is 2", "y1 is not 1"],
+        )
+        checkDecode(self, solver, 5)
+
+    def test_z3_rejected(self):
+        self.addCleanup(EXPCONFIG.__setitem__, "solver", EXPCONFIG["solver"])
+        EXPCONFIG["solver"] = "z3"
+        with self.assertRaisesRegex(ValueError, "not supported"):
+            Solver(buildPuzzle())
@@ -0,0 +1,290 @@
+import unittest
+import types
+import multiprocessing
+from pysat.formula import CNF
+from demystify.base import VarMatrix, Puzzle, EqVal, NeqVal
+from demystify.buildpuz import buildNeq
+from demystify.internal import Solver
+from demystify.musdict import MusDict
+from demystify.config import EXPCONFIG, getDefaultConfig
+from demystify.parallel import getChildSolver, setChildSolver
+from demystify.utils import randomFromSeed
+from demystify.solvers.pysatimpl import SATSolver
+import demystify.mus
+from demystify.mus import (
+    CoreArray, CorePool, growingCore, quickXplain, rotateModel, getPropagateMUSes
+)
+
+class CoreArrayTester(unittest.TestCase):
+    def test_without(self):
+        core = CoreArray([5, -3, 8, 2])
+        self.assertEqual(len(core), 4)
+        self.assertIn(8, core)
+        self.assertNotIn(3, core)
+        self.assertEqual(core.without(8), [5, -3, 2])
+        # without does not change the core
+        self.assertEqual(core.tolist(), [5, -3, 8, 2])
+
+
+class CorePoolTester(unittest.TestCase):
+    def test_add(self):
+        pool = CorePool()
+        self.assertEqual(pool.cores(), [])
+        pool.add([4, 9])
+        pool.add([])
+        # Too big to store
+        pool.add(list(range(1, CorePool.WIDTH + 2)))
+        self.assertEqual(pool.cores(), [[4, 9], []])
+
+    def test_replace_oldest(self):
+        pool = CorePool()
+        for i in range(CorePool.SLOTS + 1):
+            pool.add([i + 1])
+        cores = pool.cores()
+        self.assertEqual(len(cores), CorePool.SLOTS)
+        self.assertNotIn([1], cores)
+        self.assertIn([CorePool.SLOTS + 1], cores)
+
+
+# Unsatisfiable exactly when both 2 and 5 are assumed
+class FakeSolver:
+    def basicCore(self, lits):
+        if 2 in lits and 5 in lits:
+            return [2, 5]
+        return None
+
+class QuickXplainTester(unittest.TestCase):
+    def test_quickxplain(self):
+        cons = [1, 2, 3, 4, 5, 6]
+        self.assertEqual(sorted(quickXplain(FakeSolver(), [], cons, 10)), [2, 5])
+        self.assertEqual(sorted(quickXplain(FakeSolver(), [2], cons, 10)), [5])
+        self.assertIsNone(quickXplain(FakeSolver(), [], cons, 1))
+
+    def test_uses_core(self):
+        # The first half gives the core [2, 5], so the rest is never looked at
+        queries = []
+        solver = FakeSolver()
+        basicCore = solver.basicCore
+        solver.basicCore = lambda lits: queries.append(lits) or basicCore(lits)
+        self.assertEqual(sorted(quickXplain(solver, [], list(range(1, 17)), 10)), [2, 5])
+        self.assertEqual(queries, [[1, 2, 3, 4, 5, 6, 7, 8], [2], [5]])
+
+    def test_cancel(self):
+        solver = FakeSolver()
+        calls = []
+        def cancel():
+            calls.append(1)
+            return len(calls) > 2
+        cons = [1, 2, 3, 4, 5, 6]
+        self.assertIsNone(quickXplain(solver, [], cons, 10, cancel))
+        self.assertEqual(len(calls), 3)
+
+
+class RotateModelTester(unittest.TestCase):
+    def test_chain(self):
+        # Selectors 10 to 13 enforce 1, 1 -> 2, 2 -> 3 and -3, so every
+        # constraint is needed
+        cnf = CNF(from_clauses=[[1, -10], [-1, 2, -11], [-2, 3, -12], [-3, -13]])
+        solver = types.SimpleNamespace(
+            _conlits=[10, 11, 12, 13],
+            _clausegroups=None,
+            _occurs=None,
+            _solver=SATSolver(cnf),
+        )
+        Solver.init_clausegroups(solver)
+        self.assertEqual(solver._clausegroups[11], [(-1, 2)])
+        self.assertTrue(solver._solver.solve([11, 12, 13], getsol=False))
+        model = solver._solver.get_model()
+        core = CoreArray([10, 11, 12, 13])
+        self.assertEqual(rotateModel(solver, model, 10, core, [], [], 10), [11, 12, 13])
+        # Stop once more than 'limit' criticals are known
+        self.assertEqual(rotateModel(solver, model, 10, core, [], [], 2), [11, 12])
+        self.assertEqual(rotateModel(solver, model, 10, core, [], [12], 10), [11])
+        # Constraints outside the core are not criticals
+        core = CoreArray([10, 11, 13])
+        self.assertEqual(rotateModel(solver, model, 10, core, [], [], 10), [11])
+
+
+# Propagating the constraints 'a' and 'b' together gives 'x' and 'y'
+class FakePropagateSolver:
+    def propagate(self, assume=(), cons=None):
+        if cons == ["a", "b"]:
+            return ["x", "y"]
+        return []
+
+# Put back the shared state of cascadeMUS, which these tests replace,
+# once 'test' finishes
+def restoreCascadeGlobals(test):
+    for name in [
+        "CascadeLits", "LitsProved", "MUSSizeFound", "MUSSizeRequired", "SharedCores"
+    ]:
+        test.addCleanup(setattr, demystify.mus, name, getattr(demystify.mus, name))
+
+class LitsMUSProvesTester(unittest.TestCase):
+    def setUp(self):
+        restoreCascadeGlobals(self)
+        demystify.mus.CascadeLits = ["x", "y", "z"]
+        demystify.mus.LitsProved = multiprocessing.Array("b", 3)
+
+    def test_proves(self):
+        demystify.mus.MUSSizeRequired = multiprocessing.Value("l", 2)
+        solver = FakePropagateSolver()
+        self.assertEqual(demystify.mus._litsMUSProves(solver, 0, ["a", "b"]), ["y"])
+        self.assertEqual(list(demystify.mus.LitsProved), [0, 1, 0])
+        self.assertEqual(demystify.mus._litsMUSProves(solver, 2, ["a"]), [])
+
+    def test_bigger_mus(self):
+        # A MUS bigger than the round is looking for still proves the
+        # literal, but does not stop its own search
+        demystify.mus.MUSSizeRequired = multiprocessing.Value("l", 1)
+        solver = FakePropagateSolver()
+        self.assertEqual(demystify.mus._litsMUSProves(solver, 0, ["a", "b"]), ["y"])
+        self.assertEqual(list(demystify.mus.LitsProved), [0, 0, 0])
+
+
+class CascadeCancelledTester(unittest.TestCase):
+    def setUp(self):
+        restoreCascadeGlobals(self)
+
+    def test_cancelled(self):
+        demystify.mus.MUSSizeFound = multiprocessing.Value("l", 5)
+        demystify.mus.MUSSizeRequired = multiprocessing.Value("l", 3)
+        demystify.mus.LitsProved = multiprocessing.Array("b", 2)
+        config = {"earlyExit": True}
+        self.assertFalse(demystify.mus._cascadeCancelled(0, config))
+        demystify.mus.LitsProved[1] = 1
+        self.assertTrue(demystify.mus._cascadeCancelled(1, config))
+        self.assertFalse(demystify.mus._cascadeCancelled(0, config))
+        demystify.mus.MUSSizeFound.value = 3
+        self.assertTrue(demystify.mus._cascadeCancelled(0, config))
+        self.assertFalse(demystify.mus._cascadeCancelled(0, {"earlyExit": False}))
+
+
+# Constraints 1 to 9, where the constraints within radius r of a literal
+# are the first 1, 2, 4 and then 4 again, and a core needs 'needed'
+class FakeNeighbourhoodSolver:
+    def __init__(self, needed):
+        self._conlits = list(range(1, 10))
+        self.needed = needed
+        self.queries = []
+
+    def neighbourhood(self, lit, distance):
+        return self._conlits[: [1, 2, 4][min(distance, 3) - 1]]
+
+    def basicCore(self, lits):
+        self.queries.append(len(lits))
+        if self.needed in lits:
+            return [self.needed]
+        return None
+
+class GrowingCoreTester(unittest.TestCase):
+    def test_grow(self):
+        solver = FakeNeighbourhoodSolver(3)
+        self.assertEqual(growingCore(solver, ["p"], []), [3])
+        self.assertEqual(solver.queries, [1, 2, 4])
+
+    def test_all_constraints(self):
+        solver = FakeNeighbourhoodSolver(9)
+        self.assertEqual(growingCore(solver, ["p"], []), [9])
+        self.assertEqual(solver.queries, [1, 2, 4, 9])
+
+
+# x0, x1 and x2 take values 1 or 2, x0 and x1 are different and x0 is 1
+def buildNeqSolver():
+    varmat = VarMatrix(lambda t: "x{}".format(t[1]), (1, 3), [1, 2])
+    puzzle = Puzzle([varmat])
+    (x0, x1, x2) = varmat.varlist()
+    puzzle.addConstraints(buildNeq("different", x0, x1, [1, 2]))
+    solver = Solver(puzzle)
+    solver.init_litmappings()
+    solver.addLit(EqVal(x0, 1))
+    return (solver, x0, x1, x2)
+
+# The SAT literal of the constraint of 'solver' called 'name'
+def conlit(solver, name):
+    (lit,) = [b for (b, c) in solver._conmap.items() if c._name == name]
+    return lit
+
+class GetPropagateMUSesTester(unittest.TestCase):
+    def test_propagate(self):
+        (solver, x0, x1, x2) = buildNeqSolver()
+        puzlits = [EqVal(x1, 2), NeqVal(x1, 1), EqVal(x2, 1), NeqVal(x2, 1)]
+        musdict = MusDict()
+        remaining = getPropagateMUSes(solver, puzlits, musdict)
+        # x1 is not 1 follows from one constraint. x1 is 2 needs two, so is
+        # left for the SAT solver.
+        self.assertEqual(remaining, [EqVal(x1, 2), EqVal(x2, 1), NeqVal(x2, 1)])
+        self.assertEqual(list(musdict.keys()), [NeqVal(x1, 1)])
+        mus = musdict.get_first(NeqVal(x1, 1))
+        self.assertEqual(len(mus), 1)
+        # The MUS proves x1 is not 1, and (being one constraint) is minimal
+        x1is1 = solver._varlit2smtmap[EqVal(x1, 1)]
+        con = solver._conlit2conmap[mus[0]]
+        self.assertFalse(solver._solver.solve([x1is1, con], getsol=False))
+        self.assertTrue(solver._solver.solve([x1is1], getsol=False))
+
+
+class SharedCoreMUSTester(unittest.TestCase):
+    def setUp(self):
+        restoreCascadeGlobals(self)
+        self.addCleanup(setChildSolver, getChildSolver())
+        (self.solver, x0, x1, x2) = buildNeqSolver()
+        setChildSolver(self.solver)
+        self.p = NeqVal(x1, 1)
+        demystify.mus.CascadeLits = [self.p]
+        demystify.mus.LitsProved = multiprocessing.Array("b", 1)
+        demystify.mus.MUSSizeFound = multiprocessing.Value("l", demystify.mus.MAX_MUS)
+        demystify.mus.MUSSizeRequired = multiprocessing.Value("l", 5)
+        demystify.mus.SharedCores = CorePool()
+        self.config = dict(getDefaultConfig(), shareCores=True)
+        self.different = conlit(
+            self.solver, "x0 and x1 cannot both be 1 as they are both different"
+        )
+        self.x1both = conlit(self.solver, "x1 cannot be both 1 and 2")
+        self.x2value = conlit(self.solver, "x2 must have some value")
+
+    def test_reuse(self):
+        demystify.mus.SharedCores.add([self.x2value, self.different, self.x1both])
+        mus = demystify.mus._sharedCoreMUS(
+            randomFromSeed(1), self.solver, self.p, 5, self.config, None
+        )
+        self.assertEqual(mus, [self.solver._conmap[self.different]])
+
+    def test_not_near(self):
+        demystify.mus.SharedCores.add([self.x2value])
+        self.assertIsNone(demystify.mus._sharedCoreMUS(
+            randomFromSeed(1), self.solver, self.p, 5, self.config, None
+        ))
+
+    def test_fallback(self):
+        # This core is next to p, but does not prove it, so the search
+        # starts again from every constraint
+        demystify.mus.SharedCores.add([self.x1both])
+        self.assertIsNone(demystify.mus._sharedCoreMUS(
+            randomFromSeed(1), self.solver, self.p, 5, self.config, None
+        ))
+        (p, mus, _, _) = demystify.mus._findSmallestMUS_func(
+            (self.p, 0, "seed", 5, self.config)
+        )
+        self.assertEqual(mus, [self.solver._conmap[self.different]])
+        # The MUS is shared for later literals
+        self.assertEqual(len(demystify.mus.SharedCores.cores()), 2)
+
+
+class NeighbourhoodCacheTester(unittest.TestCase):
+    def test_limit(self):
+        oldsize = EXPCONFIG["neighbourhoodCacheSize"]
+        self.addCleanup(EXPCONFIG.__setitem__, "neighbourhoodCacheSize", oldsize)
+        EXPCONFIG["neighbourhoodCacheSize"] = 5
+        (solver, x0, x1, x2) = buildNeqSolver()
+        near = solver.neighbourhood(EqVal(x1, 1), 1)
+        self.assertEqual(len(near), 2)
+        for distance in range(1, 5):
+            solver.neighbourhood(EqVal(x1, 2), distance)
+            self.assertLessEqual(solver._neighbourhoodsize, 5)
+        # The cache only stores ids, so answers do not change
+        self.assertEqual(solver.neighbourhood(EqVal(x1, 1), 1), near)
+        self.assertEqual(
+            solver._neighbourhoodsize,
+            sum(len(ids) for ids in solver._neighbourhoods.values()),
+        )
@@ -0,0 +1,33 @@
+import unittest
+import os
+from pysat.formula import CNF
+from demystify.parallel import ProcessPool, getChildSolver, setChildSolver
+from demystify.solvers.pysatimpl import SATSolver
+
+def taskpid(x):
+    return (x, os.getpid())
+
+class ProcessPoolTester(unittest.TestCase):
+    def setUp(self):
+        # The pool sends back the stats of the child solver
+        self.addCleanup(setChildSolver, getChildSolver())
+        setChildSolver(SATSolver(CNF(from_clauses=[[1, 2]])))
+
+    def test_ordered(self):
+        args = list(range(10))
+        with ProcessPool(processes=3) as pool:
+            res = pool.map(taskpid, args, ordered=True)
+        # Every task is done exactly once, and tasks are dealt out in
+        # turn, so each process gets every third task, in order
+        self.assertEqual(sorted(x for (x, _) in res), args)
+        self.assertEqual([x for (x, _) in res], args[0::3] + args[1::3] + args[2::3])
+        for i in range(3):
+            pids = {pid for (x, pid) in res if x % 3 == i}
+            self.assertEqual(len(pids), 1)
+        self.assertEqual(len({pid for (_, pid) in res}), 3)
+
+    def test_shuffled(self):
+        args = list(range(10))
+        with ProcessPool(processes=3) as pool:
+            res = pool.map(taskpid, list(args))
+        self.assertEqual(sorted(x for (x, _) in res), args)
@@ -0,0 +1,184 @@
+import unittest
+from pysat.formula import CNF
+from demystify.config import EXPCONFIG
+from demystify.solvers.pysatimpl import (
+    SATSolver, BudgetController, AUTOTUNE_BACKENDS, autotuneCache, cnfFingerprint,
+    supportsPropBudget
+)
+
+# Selector 4 enforces 1 -> 2, selector 5 enforces 2 -> 3
+def buildSolver():
+    return SATSolver(CNF(from_clauses=[[-1, 2, -4], [-2, 3, -5], [1, 6]]))
+
+# Set EXPCONFIG[key] for the rest of 'test'
+def setConfig(test, key, value):
+    test.addCleanup(EXPCONFIG.__setitem__, key, EXPCONFIG[key])
+    EXPCONFIG[key] = value
+
+class SATSolverTester(unittest.TestCase):
+    def test_known_lits_as_units(self):
+        setConfig(self, "knownLitsAsClauses", True)
+        solver = buildSolver()
+        solver.addLit(1)
+        self.assertEqual(list(solver._unitlits), [1])
+        self.assertEqual(len(solver._assumelits), 0)
+        self.assertFalse(solver.solveLimited([4, 5, -3]))
+        self.assertEqual(sorted(solver.unsat_core()), [-3, 4, 5])
+        self.assertTrue(solver.solveLimited([4, -3]))
+
+    def test_push_pop(self):
+        solver = buildSolver()
+        solver.push()
+        solver.addLit(1)
+        self.assertEqual(list(solver._assumelits), [1])
+        self.assertFalse(solver.solveLimited([4, 5, -3]))
+        solver.pop()
+        self.assertEqual(len(solver._knownlits), 0)
+        self.assertTrue(solver.solveLimited([4, 5, -3]))
+
+    def test_nested_push_pop(self):
+        solver = buildSolver()
+        solver.push()
+        solver.addLit(1)
+        solver.push()
+        solver.addLit(-3)
+        solver.addLit(1)
+        self.assertEqual(list(solver._assumelits), [1, -3])
+        self.assertFalse(solver.solveLimited([4, 5]))
+        solver.pop()
+        self.assertEqual(solver._knownlits, {1})
+        self.assertTrue(solver.solveLimited([4, 5]))
+        solver.pop()
+        self.assertEqual(len(solver._assumelits), 0)
+
+    def test_simplify(self):
+        setConfig(self, "knownLitsAsClauses", True)
+        solver = buildSolver()
+        oldevery = EXPCONFIG["simplifyEvery"]
+        EXPCONFIG["simplifyEvery"] = 2
+        try:
+            solver.addLit(1)
+            solver.addLit(-3)
+        finally:
+            EXPCONFIG["simplifyEvery"] = oldevery
+        self.assertEqual(solver.get_stats()["simplifyCount"], 1)
+        self.assertEqual(
+            sorted(solver._simplifiedclauses()), [[-3], [-2, -5], [1], [2, -4]]
+        )
+        self.assertFalse(solver.solveLimited([4, 5]))
+        self.assertTrue(solver.solveLimited([4]))
+
+    def test_solve_all(self):
+        solver = buildSolver()
+        self.assertEqual(
+            list(solver.solveAll([1, 2, 3, 6], [4, 5, -6])[1:7]),
+            [1, 1, 1, 0, 0, -1],
+        )
+        self.assertFalse(solver.solveAll([1, 2, 3, 6], [4, 5]).any())
+        self.assertEqual(solver.solveAll([1, 2, 3], [4, 1, -2]), None)
+        # Guard variables must not interfere with later solves
+        self.assertTrue(solver.solve([4, 5], getsol=False))
+
+    def test_solve_single(self):
+        solver = buildSolver()
+        sols = solver.solveSingle([1, 2, 3, 6], [4, 5, 1, -6])
+        self.assertEqual(len(sols), 1)
+        self.assertEqual(list(sols[0][1:7]), [1, 1, 1, 1, 1, -1])
+        sols = solver.solveSingle([1, 2, 3, 6], [4, 5, 1])
+        self.assertEqual(len(sols), 2)
+        self.assertNotEqual(sols[0][6], sols[1][6])
+        self.assertEqual(solver.solveSingle([1, 2, 3], [4, 1, -2]), [])
+
+    def test_reboot(self):
+        solver = buildSolver()
+        solver.addLit(1)
+        act = solver.addGuardedClause([-3])
+        solver.reboot(seed=5)
+        self.assertFalse(solver.solveLimited([4, 5, act]))
+        solver.removeGuardedClause(act)
+        solver.reboot()
+        self.assertTrue(solver.solveLimited([4, 5]))
+        self.assertFalse(solver.solveLimited([4, 5, -3]))
+
+    def test_propagate(self):
+        solver = buildSolver()
+        solver.addLit(1)
+        (ok, lits) = solver.propagate([4, 5])
+        self.assertTrue(ok)
+        self.assertIn(3, lits)
+        (ok, lits) = solver.propagate([4, 5, -3])
+        self.assertFalse(ok)
+        self.assertEqual(solver.get_stats()["propagateCount"], 2)
+        self.assertEqual(solver.get_stats()["solveCount"], 0)
+
+    def test_phases_survive_reboot(self):
+        solver = buildSolver()
+        solver.set_phases(positive=[2, 6], negative=[1, 3])
+        solver.reboot()
+        sol = solver.solve([], getsol=True)
+        self.assertEqual(list(sol[[1, 2, 3, 6]]), [-1, 1, -1, 1])
+
+    def test_autotune(self):
+        solver = buildSolver()
+        solver.autotune([[4, 5, 1, -3], [4, -3]])
+        self.assertIn(solver._backend, AUTOTUNE_BACKENDS)
+        # Every backend is run with the same budget, so only those which
+        # support one are tried
+        self.assertTrue(supportsPropBudget(solver._backend))
+        self.assertEqual(
+            autotuneCache()[cnfFingerprint(solver._clauses)], solver._backend
+        )
+        self.assertFalse(solver.solveLimited([4, 5, 1, -3]))
+        self.assertTrue(solver.solveLimited([4, -3]))
+
+
+class BudgetControllerTester(unittest.TestCase):
+    def test_adapt(self):
+        budget = BudgetController(10000, 30000)
+        budget.phase = "a"
+        for _ in range(BudgetController.WINDOW):
+            budget.record(10000, False, 0.1)
+        self.assertEqual(budget.budget(), 20000)
+        for _ in range(BudgetController.WINDOW):
+            budget.record(20000, False, 0.1)
+        self.assertEqual(budget.budget(), 30000)
+        # Other phases keep their own budget
+        budget.phase = "b"
+        self.assertEqual(budget.budget(), 10000)
+        for _ in range(BudgetController.WINDOW):
+            budget.record(3000, True, 0.01)
+        self.assertEqual(budget.budget(), 6000)
+
+    def test_merge(self):
+        budget = BudgetController(10000, 30000)
+        budget.phase = "a"
+        for _ in range(BudgetController.WINDOW // 2):
+            budget.record(20000, False, 0.1)
+        # Two workers, which each saw half a window with no new budget
+        worker = BudgetController(10000, 30000)
+        worker.phase = "a"
+        for _ in range(BudgetController.WINDOW // 2):
+            worker.record(10000, False, 0.1)
+        first = worker.takeDelta()
+        self.assertEqual(worker.takeDelta(), ({}, {}))
+        budget.merge([first, ({}, {})])
+        self.assertEqual(budget.budget(), 20000)
+        # A worker which changed a budget
+        worker.phase = "b"
+        for _ in range(BudgetController.WINDOW):
+            worker.record(1000, True, 0.1)
+        budget.merge([worker.takeDelta()])
+        budget.phase = "b"
+        self.assertEqual(budget.budget(), 2000)
+
+    def test_solver_tuning(self):
+        parent = buildSolver()
+        child = buildSolver()
+        child.set_phase("a")
+        for _ in range(BudgetController.WINDOW):
+            child._budget.record(3000, True, 0.01)
+        child._basecost = 1e-6
+        parent.add_tuning([child.take_tuning()])
+        parent.set_phase("a")
+        self.assertEqual(parent._budget.budget(), 6000)
+        self.assertEqual(parent._basecost, 1e-6)
@@ -0,0 +1,66 @@
+import unittest
+from demystify.querycache import ModelCache, CoreCache
+
+class ModelCacheTester(unittest.TestCase):
+    def test_empty(self):
+        cache = ModelCache(4)
+        self.assertEqual(len(cache), 0)
+        self.assertFalse(cache.check([1, -2]))
+
+    def test_check(self):
+        cache = ModelCache(4)
+        cache.add([1, -2, 3, -9])
+        cache.add([-1, 2, 3])
+        self.assertTrue(cache.check([1, -2, -9]))
+        self.assertTrue(cache.check([2, 3]))
+        self.assertTrue(cache.check([]))
+        self.assertFalse(cache.check([1, 2]))
+        # Variable 9 is not given a value by the second model
+        self.assertFalse(cache.check([2, -9]))
+        self.assertFalse(cache.check([10]))
+
+    def test_replace_oldest(self):
+        cache = ModelCache(2)
+        cache.add([1, 2])
+        cache.add([-1, 2])
+        cache.add([-1, -2])
+        self.assertEqual(len(cache), 2)
+        self.assertFalse(cache.check([1]))
+        self.assertTrue(cache.check([-1, -2]))
+        cache.clear()
+        self.assertFalse(cache.check([-1, -2]))
+
+    def test_disable(self):
+        cache = ModelCache(2, minhitrate=0.5)
+        cache.add([1])
+        for _ in range(ModelCache.WARMUP):
+            self.assertFalse(cache.check([-1]))
+        self.assertFalse(cache.active())
+        self.assertFalse(cache.check([1]))
+
+
+class CoreCacheTester(unittest.TestCase):
+    def test_find_subset(self):
+        cache = CoreCache(4)
+        self.assertIsNone(cache.find([1, 2]))
+        cache.add([-1, 5, 7])
+        cache.add([-2, 5])
+        self.assertEqual(cache.find([8, 7, 6, 5, -1]), [7, 5, -1])
+        self.assertEqual(cache.find([-2, 3, 5]), [-2, 5])
+        self.assertIsNone(cache.find([-1, 5, 8]))
+
+    def test_empty_core(self):
+        cache = CoreCache(4)
+        cache.add([])
+        self.assertEqual(cache.find([1, 2]), [])
+
+    def test_lru_eviction(self):
+        cache = CoreCache(2)
+        cache.add([1, 2])
+        cache.add([3, 4])
+        # Using [1, 2] makes [3, 4] the least recently used
+        self.assertEqual(cache.find([1, 2]), [1, 2])
+        cache.add([5, 6])
+        self.assertEqual(len(cache), 2)
+        self.assertIsNone(cache.find([3, 4]))
+        self.assertEqual(cache.find([1, 2, 5, 6]), [1, 2])
@@ -0,0 +1,27 @@
+import unittest
+import os
+import glob
+import tempfile
+from pysat.formula import CNF
+from demystify.config import EXPCONFIG
+from demystify.solvers.pysatimpl import SATSolver
+from demystify.satlog import readSATLog, replaySATLog, SOLVE, UNSAT
+
+class SATLogTester(unittest.TestCase):
+    def test_record_replay(self):
+        tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmpdir.cleanup)
+        EXPCONFIG["recordSAT"] = os.path.join(tmpdir.name, "log")
+        self.addCleanup(EXPCONFIG.__setitem__, "recordSAT", None)
+        solver = SATSolver(CNF(from_clauses=[[-1, 2, -4], [-2, 3, -5], [1, 6]]))
+        self.addCleanup(solver.closeRecorder)
+        solver.addLit(1)
+        self.assertFalse(solver.solveLimited([4, 5, -3]))
+        self.assertTrue(solver.solve([4, -3], getsol=False))
+        (log,) = glob.glob(os.path.join(tmpdir.name, "log-*.satlog"))
+        tags = [tag for (tag, _, _) in readSATLog(log)]
+        self.assertEqual(tags.count(SOLVE), 2)
+        self.assertIn(UNSAT, tags)
+        stats = replaySATLog(log, backend="g3")
+        self.assertEqual(stats["solveCount"], 2)
+        self.assertEqual(stats["mismatchCount"], 0)
@@ -0,0 +1,54 @@
+import unittest
+from demystify.musdict import MusDict
+from demystify.scheduler import LiteralScheduler
+
+class LiteralSchedulerTester(unittest.TestCase):
+    def test_order(self):
+        sched = LiteralScheduler()
+        # With no history, the order is kept
+        self.assertEqual(sched.order(["a", "b", "c", "d"]), ["a", "b", "c", "d"])
+        sched.record("a", None, 50)
+        sched.record("b", ("x", "y", "z"), 10)
+        sched.record("c", ("x",), 30)
+        sched.record("d", None, 5)
+        sched.record("d", ("y",), 5)
+        musdict = MusDict()
+        musdict.update("b", ("x", "y", "z"))
+        musdict.update("c", ("x",))
+        musdict.update("d", ("y",))
+        sched.endStep(musdict)
+        self.assertEqual(len(sched), 3)
+        # Smallest MUS first, then cheapest; literals never seen before
+        # come ahead of those which failed
+        self.assertEqual(sched.order(["a", "e", "b", "c", "d"]), ["d", "c", "b", "e", "a"])
+
+    def test_failures(self):
+        sched = LiteralScheduler()
+        for lit in ["a", "b"]:
+            sched.record(lit, None, 1)
+        sched.endStep(MusDict())
+        sched.record("a", None, 1)
+        sched.endStep(MusDict())
+        self.assertEqual(sched.order(["a", "b"]), ["b", "a"])
+        # A literal proved by another literal's MUS has not failed
+        musdict = MusDict()
+        musdict.update("a", ("x", "y"))
+        sched.record("a", None, 1)
+        sched.endStep(musdict)
+        self.assertEqual(sched.order(["b", "a"]), ["a", "b"])
+
+    def test_stops_succeeding(self):
+        sched = LiteralScheduler()
+        musdict = MusDict()
+        musdict.update("a", ("x",))
+        sched.record("a", ("x",), 1)
+        sched.endStep(musdict)
+        self.assertEqual(sched.order(["b", "a"]), ["a", "b"])
+        # 'a' now fails every step, while 'b' keeps finding bigger MUSes
+        for _ in range(3):
+            musdict = MusDict()
+            musdict.update("b", ("x", "y", "z"))
+            sched.record("a", None, 1)
+            sched.record("b", ("x", "y", "z"), 1)
+            sched.endStep(musdict)
+            self.assertEqual(sched.order(["a", "b"]), ["b", "a"])
@@ -0,0 +1,21 @@
+import unittest
+import os
+from demystify.screen import screen_instances
+
+EXAMPLES = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.realpath(__file__))), "example-json"
+)
+
+class ScreenTester(unittest.TestCase):
+    def test_screen(self):
+        instances = [
+            ("json", os.path.join(EXAMPLES, "thermo.json")),
+            ("json", os.path.join(EXAMPLES, "miracle.json")),
+            ("json", os.path.join(EXAMPLES, "missing.json")),
+        ]
+        results = list(screen_instances(instances, cores=1))
+        self.assertEqual(results[0]["result"], "unique")
+        self.assertEqual(results[1]["result"], "multiple")
+        # A bad instance gives an error, and does not stop the others
+        self.assertNotIn("result", results[2])
+        self.assertIn("FileNotFoundError", results[2]["error"])
@@ -102,6 +102,13 @@ parser.add_argument(
     help="After building puzzle, save as a Pickled Python object (for future loading)"
 )
 
+parser.add_argument(
+    '--recordsat',
+    type=str,
+    default=None,
+    help="Record all SAT queries to files starting with this prefix (see demystify.satlog)"
+)
+
 parser.add_argument(
     '--unpickle',
     type=str,
@@ -140,6 +147,9 @@ demystify.config.LoadConfigFromDict(
 if args.multiple:
     demystify.config.LoadConfigFromDict(demystify.config.CONFIG_MORE_MUS)
 
+if args.recordsat is not None:
+    demystify.config.EXPCONFIG["recordSAT"] = args.recordsat
+
 if args.forqes:
     mus_finder = "forqes"
 else:
@@ -1,5 +1,6 @@
 import itertools
 import functools
+import weakref
 
 from typing import Sequence
 
@@ -9,12 +10,41 @@ from sortedcontainers import *
 
 
 # Represent 'var == val'
-@functools.total_ordering
+# Lits are interned, so there is only ever one Lit for each (var, val, equal)
+# which is alive. This saves memory, and means equality is usually just an
+# identity check. The table is keyed on the identity of 'var' (Vars with the
+# same name compare equal, but can have different domains and locations),
+# so Lit(v, val, equal).var is always v. A Lit keeps its Var alive, so the
+# id cannot be reused while the entry is in the table.
 class Lit:
-    def __init__(self, var, val: int, equal: bool):
-        self.var = var
-        self.val = val
-        self.equal = equal
+    __slots__ = ("var", "val", "equal", "_key", "_hash", "__weakref__")
+
+    _table = weakref.WeakValueDictionary()
+
+    def __new__(cls, var, val: int, equal: bool):
+        key = (id(var), val, equal)
+        lit = Lit._table.get(key)
+        if lit is None:
+            lit = object.__new__(cls)
+            lit.var = var
+            lit.val = val
+            lit.equal = equal
+            # Lits are sorted by variable name, then value, then equal
+            lit._key = (var._name, val, equal)
+            lit._hash = hash(lit._key)
+            Lit._table[key] = lit
+        return lit
+
+    # Make sure pickling goes through the intern table
+    def __reduce__(self):
+        return (Lit, (self.var, self.val, self.equal))
+
+    # Lits never change, so copies can share them (and their Var)
+    def __copy__(self):
+        return self
+
+    def __deepcopy__(self, memo):
+        return self
 
     def __repr__(self) -> str:
         if self.equal:
@@ -23,21 +53,33 @@ class Lit:
             return "{} is not {}".format(self.var, self.val)
 
     def __eq__(self, other) -> bool:
-        return (self.var, self.val, self.equal) == (
-            other.var,
-            other.val,
-            other.equal,
-        )
+        if self is other:
+            return True
+        if not isinstance(other, Lit):
+            return NotImplemented
+        return self._key == other._key
+
+    def __ne__(self, other) -> bool:
+        if self is other:
+            return False
+        if not isinstance(other, Lit):
+            return NotImplemented
+        return self._key != other._key
 
     def __lt__(self, other) -> bool:
-        return (self.var, self.val, self.equal) < (
-            other.var,
-            other.val,
-            other.equal,
-        )
+        return self._key < other._key
+
+    def __le__(self, other) -> bool:
+        return self._key <= other._key
+
+    def __gt__(self, other) -> bool:
+        return self._key > other._key
+
+    def __ge__(self, other) -> bool:
+        return self._key >= other._key
 
     def __hash__(self):
-        return (self.var, self.val, self.equal).__hash__()
+        return self._hash
 
     def neg(self):
         return Lit(self.var, self.val, not self.equal)
@@ -206,10 +248,13 @@ def cellHasValue(var, dom):
 
 @functools.total_ordering
 class Var:
+    __slots__ = ("_dom", "_name", "_location", "_hash", "__weakref__")
+
     def __init__(self, name: str, dom: Sequence[int], location):
         self._dom = dom
         self._name = str(name)
         self._location = location
+        self._hash = hash(self._name)
 
     def dom(self):
         return self._dom
@@ -257,13 +302,13 @@ class Var:
         return self._name
 
     def __eq__(self, other):
-        return self._name == other._name
+        return self is other or self._name == other._name
 
     def __lt__(self, other):
         return self._name < other._name
 
     def __hash__(self):
-        return self._name.__hash__()
+        return self._hash
 
 
 class VarMatrix:
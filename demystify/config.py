@@ -8,6 +8,12 @@ EXPCONFIG = {
     # Dump out SAT instances, for other MUS solvers
     # WHen using this, set cores=0 and repeats=1
     "dumpSAT": False,
+    # Run (slow) internal consistency checks
+    "debugChecks": False,
+    # Record every SAT query in a binary log '<recordSAT>-<pid>-<n>.satlog'
+    # (one per solver and process), which can be replayed with
+    # 'python3 -m demystify.satlog' (None = don't record)
+    "recordSAT": None,
     # Cache MUSes between steps
     "useCache": True,
     # Use same pool of solvers throughout
@@ -20,8 +26,57 @@ EXPCONFIG = {
     # Limit search to searchLimitedBudget conflicts
     "solveLimited": True,
     "solveLimitedBudget": 10000,
-    # Which solver to use (g4 = glucose), z3 = Use Z3
+    # Adjust the budget for each phase of MUS finding, depending on how
+    # often queries run out of budget (solveLimitedBudget is the start)
+    "adaptiveBudget": True,
+    "solveLimitedMaxBudget": 1000000,
+    # Which pysat solver to use (g4 = glucose), or "autotune" to try
+    # several pysat solvers on each puzzle and use the fastest. Z3 is not
+    # supported.
     "solver": "g4",
+    # Use unit propagation (which is much cheaper than a SAT call) to find
+    # the literals a MUS proves, where it is enough
+    "usePropagate": True,
+    # Rebuild a SAT solver (dropping its learned clauses) when it has seen
+    # rebootConflicts conflicts, or its time per propagation has grown by
+    # rebootSlowdown times. With rebootSeed, shuffle the clauses on reboot.
+    "rebootPolicy": True,
+    "rebootConflicts": 100000,
+    "rebootSlowdown": 3.0,
+    "rebootSeed": True,
+    # File to remember autotune's choices in (None = only in memory)
+    "autotuneCache": None,
+    # How many sample queries autotune times each solver on
+    "autotuneQueries": 20,
+    # How many times autotune runs the sample queries on each solver (it
+    # compares the median times)
+    "autotuneRepeats": 3,
+    # Add known literals to the SAT solver as unit clauses, rather than
+    # passing them as assumptions to every solve. Off by default, as the
+    # solver then finds different (equally small) MUSes
+    "knownLitsAsClauses": False,
+    # When using knownLitsAsClauses, rebuild the solver from a simplified
+    # CNF after this many literals have been added (0 = never rebuild)
+    "simplifyEvery": 100,
+    # How many recent models each solver keeps, to answer satisfiable
+    # queries without calling the SAT solver (0 = disable)
+    "modelCacheSize": 32,
+    # Stop using the model cache if it answers less than this fraction
+    # of queries
+    "modelCacheMinHitRate": 0.1,
+    # How many unsat cores each solver keeps, to answer queries which
+    # contain a known core without calling the SAT solver (0 = disable)
+    "coreCacheSize": 1000,
+    # Stop using the core cache if, after its first 500 lookups, it answers
+    # less than this fraction of them (0 = always use it)
+    "coreCacheMinHitRate": 0.05,
+    # How many candidate literals to check at once when finding the
+    # backbone of a problem with multiple solutions
+    "backboneChunkSize": 100,
+    # How many constraint ids (4 bytes each) each solver keeps in its cache
+    # of literal neighbourhoods (the constraints near a literal, used to
+    # find tiny MUSes)
+    "neighbourhoodCacheSize": 4000000,
 
 }
 
@@ -40,9 +95,17 @@ CONFIG_FAST = {
     # instead look for cascadeMult*k, because it is not too much
     # more work and we might want it later
     "cascadeMult": 2,
+    # Before checkSmall1, find MUSes of size 0 and 1 with unit propagation
+    "checkPropagate": True,
     "checkSmall1": True,
     "checkSmall2": False,
+    # Instead of checkSmall1, checkSmall2 and looking for small MUSes in
+    # all constraints, look in neighbourhoods of growing radius
+    "adaptiveRadius": False,
     "checkCloseFirst": False,
+    # Look for MUSes for the literals which had the smallest MUSes in
+    # earlier steps first
+    "literalScheduler": True,
     # Smallest size of MUS to look for
     "baseSizeMUS": 4,
     # Alternative, safer, MUS-finding algorithm
@@ -54,6 +117,18 @@ CONFIG_FAST = {
     "tryManyChopMUS": True,
     "minPrecheckMUS": False,
     "minPrecheckStepsMUS": False,
+    # Shrink MUSes with QuickXplain, rather than deleting one constraint
+    # at a time
+    "quickXplainMUS": False,
+    # When a constraint cannot be removed from a MUS, use the model which
+    # shows this to find more constraints which cannot be removed
+    "modelRotation": True,
+    # In cascadeMUS, first look for each MUS inside a MUS already found
+    # for a nearby literal
+    "shareCores": True,
+    # In cascadeMUS, use unit propagation to find which other literals
+    # each MUS proves, and skip their tasks for the rest of the round
+    "skipProvedLits": True,
 
     # Include larger MUSes in choices
     "findLarger": False,
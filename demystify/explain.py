@@ -8,6 +8,7 @@ from .mus import CascadeMUSFinder, checkWhichLitsAMUSProves
 from .musforqes import ForqesMUSFinder
 from .utils import flatten, in_flattened, intsqrt, lowsqrt
 from .base import EqVal, NeqVal
+from .internal import MultipleSolutions
 
 from .config import getDefaultConfig, getMoreMusConfig, getHintConfig
 
@@ -56,6 +57,7 @@ class Explainer(object):
     def init_from_json(self, puzzle_json):
         self.puzzle, self.solver = parse_json(puzzle_json)
         self.solution = self._get_puzzle_solution()
+        self.solver.set_solution_phases(self.solution)
         self.unexplained = copy.deepcopy(self.solution)
         self._set_mus_finder()
 
@@ -65,6 +67,7 @@ class Explainer(object):
         )
         self.name = os.path.basename(eprime)
         self.solution = self._get_puzzle_solution(allow_incomplete=allow_incomplete)
+        self.solver.set_solution_phases(self.solution)
         self.unexplained = copy.deepcopy(self.solution)
         self._set_mus_finder()
 
@@ -441,7 +444,12 @@ class Explainer(object):
         if solution is None:
             raise SolveError("Your problem has no solution!")
 
-        if solution == "Multiple" and not allow_incomplete:
+        if isinstance(solution, MultipleSolutions):
+            logging.debug(
+                "Solutions differ: %s, %s",
+                SortedSet(solution.first) - SortedSet(solution.second),
+                SortedSet(solution.second) - SortedSet(solution.first),
+            )
             raise SolveError("Your problem has multiple solutions!")
 
         if no_domains:
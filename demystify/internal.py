@@ -1,14 +1,17 @@
 # This files includes all code which needs to actually call the SMT solver
 
 import copy
+import collections
 import types
 import random
 import logging
+import numpy
 from sortedcontainers import *
 
-from .utils import flatten, chainlist, randomFromSeed
+from .utils import flatten, chainlist, randomFromSeed, buildcsr, csrunion
 
 from .base import EqVal, NeqVal
+from .querycache import ModelCache, CoreCache
 
 from .config import EXPCONFIG
 
@@ -16,16 +19,25 @@ from .config import EXPCONFIG
 # from .solvers.z3impl import Z3Solver
 from .solvers.pysatimpl import SATSolver
 
+# Returned by Solver.solveSingle when a problem has more than one solution,
+# 'first' and 'second' are two different solutions (as lists of literals)
+MultipleSolutions = collections.namedtuple(
+    "MultipleSolutions", ["first", "second"]
+)
+
 
 class Solver:
     def __init__(self, puzzle, *, cnf=None, litmap=None, conmap=None):
         assert puzzle is not None
 
         self._puzzle = puzzle
+        # The Z3 backend (solvers/z3impl.py) lacks models, propagation,
+        # phases and the CNF access MUS finding needs
         if EXPCONFIG["solver"] == "z3":
-            self._solver = Z3Solver()
-        else:
-            self._solver = SATSolver()
+            raise ValueError(
+                "The z3 solver is not supported, use a pysat solver such as 'g4'"
+            )
+        self._solver = SATSolver()
 
         # We want a reliable random source
         self.random = randomFromSeed(1)
@@ -53,19 +65,45 @@ class Solver:
         # Set, so we quickly know is an internal variable represents a variable
         self._varsmt = SortedSet([])
 
-        # Used for tracking in push/pop/addLits
+        # Used for tracking in push/pop/addLits. _knownlits is every known
+        # literal in the order they were added, and _knownset is the same
+        # literals as a set. For each push, _stackknownlits stores the length
+        # of _knownlits when it was done, so pop only removes the newer ones.
         self._stackknownlits = []
         self._knownlits = []
+        self._knownset = set()
 
         # For benchmarking
         self._corecount = 0
 
+        # Recent models, used to answer satisfiable queries in basicCore
+        self._modelcache = ModelCache(
+            EXPCONFIG["modelCacheSize"], EXPCONFIG["modelCacheMinHitRate"]
+        )
+        # Unsat cores, used to answer unsatisfiable queries in basicCore
+        self._corecache = CoreCache(
+            EXPCONFIG["coreCacheSize"], EXPCONFIG["coreCacheMinHitRate"]
+        )
+        self.reset_stats()
+
         self._cnf = []
 
+        # Mappings used to find tiny MUSes, built by init_litmappings
+        self._lit2con = None
+
+        # Clauses of each constraint, used by model rotation, built by
+        # init_clausegroups
+        self._clausegroups = None
+        self._occurs = None
+
+        # The model found by the last satisfiable basicCore, if any
+        self._lastmodel = None
+
         if cnf is not None:
             self.init_fromCNF(cnf, litmap, conmap)
-
-            self.init_litmappings()
+            self.init_decoding()
+            if EXPCONFIG["solver"] == "autotune":
+                self.autotune()
             return
 
         for mat in self._puzzle.vars():
@@ -111,7 +149,35 @@ class Solver:
             self._conlit2conmap[c] = var
             self._conlits.add(var)
 
-        self.init_litmappings()
+        self.init_decoding()
+        if EXPCONFIG["solver"] == "autotune":
+            self.autotune()
+
+    # Pick the fastest SAT solver for this puzzle, on queries like the ones
+    # MUS finding makes: a literal which is false in a solution, assumed
+    # with every constraint, and then with the core of that query minus one
+    # constraint (the deletion steps which take most of the time).
+    def autotune(self):
+        sol = self._solver.solve(list(self._conlits), getsol=True)
+        if sol is None:
+            return
+        r = randomFromSeed(2)
+        varsmt = list(self._varsmt)
+        queries = []
+        for _ in range(min(EXPCONFIG["autotuneQueries"], len(varsmt))):
+            if len(queries) >= EXPCONFIG["autotuneQueries"]:
+                break
+            b = varsmt[r.randint(len(varsmt))]
+            b = -b if sol[b] > 0 else b
+            cons = list(self._conlits)
+            r.shuffle(cons)
+            queries.append([b] + cons)
+            if self._solver.solveLimited([b] + cons) is not False:
+                continue
+            core = [c for c in self._solver.unsat_core() if c != b]
+            for i in r.choice(len(core), min(3, len(core)), replace=False):
+                queries.append([b] + core[:i] + core[i + 1 :])
+        self._solver.autotune(queries[: EXPCONFIG["autotuneQueries"]])
 
     def init_fromCNF(self, cnf, litmap, conmap):
         assert EXPCONFIG["solver"] != "z3"
@@ -134,34 +200,137 @@ class Solver:
             self._conlit2conmap[con] = var
             self._conlits.add(var)
 
+        self._solver.set_phases(positive=self._varsmt, negative=self._conlits)
+
+    # Set up arrays to turn a SAT model into literals with one numpy gather.
+    # Entry i says that if SAT variable _decodevar[i] has value
+    # _decodeval[i] (1 or -1), then _decodelits[i] is true. The entries
+    # are ordered by variable, then literal, as in _varsmt2litmap.
+    def init_decoding(self):
+        decodevar = []
+        decodeval = []
+        decodelits = []
+        for b in self._varsmt:
+            for (val, litmap) in ((1, self._varsmt2litmap), (-1, self._varsmt2neglitmap)):
+                for lit in litmap[b]:
+                    decodevar.append(b)
+                    decodeval.append(val)
+                    decodelits.append(lit)
+        self._decodevar = numpy.array(decodevar, dtype=numpy.int64)
+        self._decodeval = numpy.array(decodeval, dtype=numpy.int8)
+        self._decodelits = numpy.empty(len(decodelits), dtype=object)
+        self._decodelits[:] = decodelits
+
+    # These mappings are only needed for finding MUSes, so they are not
+    # built until a MUS finder is created.
+    # Literals and constraints are given dense ids, and we store two sparse
+    # (CSR) matrices: from a literal to the constraints it is in (negated),
+    # and from a constraint to the (negated) literals in it.
     def init_litmappings(self):
-        # Set up some mappings for efficient finding of tiny MUSes
-        # Map from a var lit to all the constraints it is in
-        self._varlit2con = {l: SortedSet() for l in self._varlit2smtmap.keys()}
-
-        # Map from a var lit to the negation of all lits it is in a constraint with
-        # (to later make distance 2 mappings)
-        self._varlit2negconnectedlits = {
-            l: SortedSet() for l in self._varlit2smtmap.keys()
-        }
+        if self._lit2con is not None:
+            return
+
+        self._litids = {l: i for (i, l) in enumerate(self._varlit2smtmap.keys())}
+        # Constraint ids are in the same order as _conlits
+        self._conids = numpy.array(self._conlits, dtype=numpy.int64)
+
+        conrows = []
+        litcols = []
+        for (j, cvar) in enumerate(self._conids.tolist()):
+            for l in SortedSet(l.neg() for l in self._conmap[cvar].lits()):
+                conrows.append(j)
+                litcols.append(self._litids[l])
+
+        self._con2lit = buildcsr(conrows, litcols, len(self._conids))
+        self._lit2con = buildcsr(litcols, conrows, len(self._litids))
+
+        # Memoised results of neighbourhood, in LRU order, and the total
+        # number of constraint ids they hold
+        self._neighbourhoods = collections.OrderedDict()
+        self._neighbourhoodsize = 0
+
+    # The constraints (as SAT literals, in sorted order) within 'distance'
+    # of a literal. Distance 1 is the constraints the literal's negation
+    # appears in, distance 2 adds the constraints which share a literal with
+    # those, and so on.
+    def neighbourhood(self, lit, distance):
+        return self._conids[self._neighbourhoodids(lit, distance)].tolist()
+
+    # The ids of the constraints in neighbourhood(lit, distance), built from
+    # the neighbourhood at distance - 1, so growing the distance one step
+    # at a time only does one step of work each time
+    def _neighbourhoodids(self, lit, distance):
+        key = (lit, distance)
+        ids = self._neighbourhoods.get(key)
+        if ids is not None:
+            self._neighbourhoods.move_to_end(key)
+            return ids
+
+        (litptr, litcons) = self._lit2con
+        (conptr, conlits) = self._con2lit
+        (nlits, ncons) = (len(self._litids), len(self._conids))
+        if distance == 1:
+            ids = csrunion(
+                litptr, litcons, numpy.array([self._litids[lit]]), ncons
+            )
+        else:
+            ids = self._neighbourhoodids(lit, distance - 1)
+            lits = csrunion(conptr, conlits, ids, nlits)
+            ids = csrunion(litptr, litcons, lits, ncons)
+
+        # Big radii hold most constraints, so the cache is limited by the
+        # number of ids it holds, rather than the number of neighbourhoods
+        ids = ids.astype(numpy.int32)
+        self._neighbourhoods[key] = ids
+        self._neighbourhoodsize += len(ids)
+        while (
+            self._neighbourhoodsize > EXPCONFIG["neighbourhoodCacheSize"]
+            and len(self._neighbourhoods) > 1
+        ):
+            (_, old) = self._neighbourhoods.popitem(last=False)
+            self._neighbourhoodsize -= len(old)
+        return ids
+
+    # Model rotation (see mus.rotateModel) needs the clauses of each
+    # constraint. _clausegroups maps each constraint's SAT literal to its
+    # clauses (without that literal), and 0 to the clauses which are always
+    # on. _occurs maps each SAT literal to the (group, clause) pairs it is
+    # in. _occurs is left as None if a clause is in more than one group.
+    def init_clausegroups(self):
+        if self._clausegroups is not None:
+            return
 
-        for (cvar, con) in self._conmap.items():
-            lits = con.lits()
-            # Negate all the lits
-            neglits = [l.neg() for l in lits]
-            for l in neglits:
-                self._varlit2con[l].add(cvar)
-                self._varlit2negconnectedlits[l].update(neglits)
-
-        # Map from a var lit to all constraints it is distance 2 from
-        self._varlit2con2 = (
-            {}
-        )  # {l : SortedSet() for l in self._varlit2smtmap.keys() }
-        for (lit, connected) in self._varlit2negconnectedlits.items():
-            allcon = SortedSet.union(
-                *[self._varlit2con[x] for x in connected], SortedSet()
-            ).union(self._varlit2con[lit])
-            self._varlit2con2[lit] = allcon
+        groups = {c: [] for c in self._conlits}
+        groups[0] = []
+        occurs = {}
+        self._clausegroups = groups
+        for clause in self._solver.clauses():
+            sels = [-l for l in clause if l < 0 and -l in groups]
+            if len(sels) > 1:
+                return
+            g = sels[0] if len(sels) > 0 else 0
+            c = tuple(l for l in clause if l != -g)
+            groups[g].append(c)
+            for l in c:
+                occurs.setdefault(l, []).append((g, c))
+        self._occurs = occurs
+
+    # Can model rotation be used (only if each clause belongs to at most one
+    # constraint)
+    def canRotate(self):
+        self.init_clausegroups()
+        return self._occurs is not None
+
+    # Once the solution is known, make the SAT solver try it (with all
+    # constraints on) first. Most queries while finding MUSes are close to
+    # the solution, so this saves search. The phases are kept by reboot,
+    # pickling and forking.
+    def set_solution_phases(self, solution):
+        self._solver.set_phases(
+            positive=chainlist(
+                [self._varlit2smtmap[l] for l in solution], self._conlits
+            )
+        )
 
     def puzzle(self):
         return self._puzzle
@@ -199,17 +368,42 @@ class Solver:
     def reboot(self, seed):
         self._solver.reboot(seed)
 
-    Multiple = "Multiple"
-
+    # Turn a model (as returned by SATSolver.solve) into a list of literals
     def var_smt2lits(self, model):
-        ret = []
-        for l in self._varsmt:
-            if l in model:
-                if model[l]:
-                    ret.extend(self._varsmt2litmap[l])
-                else:
-                    ret.extend(self._varsmt2neglitmap[l])
-        return ret
+        if len(self._decodevar) == 0:
+            return []
+        maxvar = self._decodevar[-1]
+        if len(model) <= maxvar:
+            model = numpy.concatenate(
+                (model, numpy.zeros(maxvar + 1 - len(model), dtype=model.dtype))
+            )
+        picked = model[self._decodevar] == self._decodeval
+        return self._decodelits[picked].tolist()
+
+    # Can propagate be used (it depends on the SAT solver, and usePropagate)
+    def canPropagate(self):
+        return EXPCONFIG["usePropagate"] and self._solver.canPropagate()
+
+    # Unit propagate the known literals, the literals in 'assume' and the
+    # constraints in 'cons' (all constraints if None), without search.
+    # Returns None if this gives a conflict, or else the literals which are
+    # set by propagation.
+    def propagate(self, assume=tuple(), cons=None):
+        if cons is None:
+            conlits = self._conlits
+        else:
+            conlits = [self._conlit2conmap[c] for c in cons]
+        smtassume = [self._varlit2smtmap[l] for l in assume]
+        (ok, implied) = self._solver.propagate(chainlist(conlits, smtassume))
+        if not ok:
+            return None
+        lits = []
+        for b in implied:
+            if b > 0 and b in self._varsmt2litmap:
+                lits.extend(self._varsmt2litmap[b])
+            elif b < 0 and -b in self._varsmt2neglitmap:
+                lits.extend(self._varsmt2neglitmap[-b])
+        return lits
 
     def solve(self, assume=tuple(), *, getsol):
         smtassume = [self._varlit2smtmap[l] for l in assume]
@@ -224,7 +418,7 @@ class Solver:
             return self.var_smt2lits(sol)
 
     # This is the same as 'solve', but checks if there are many solutions,
-    # returning Solver.Multiple if there is more than one solution
+    # returning MultipleSolutions if there is more than one solution
     def solveSingle(self, assume=tuple()):
         smtassume = [self._varlit2smtmap[l] for l in assume]
         sol = self._solveSingle(smtassume)
@@ -233,40 +427,61 @@ class Solver:
         elif len(sol) == 1:
             return self.var_smt2lits(sol[0])
         else:
-            print("Multiple solutions!")
-            sol1 = self.var_smt2lits(sol[0])
-            sol2 = self.var_smt2lits(sol[1])
-            print(SortedSet([s for s in sol1 if s.equal]))
-            print(SortedSet([s for s in sol2 if s.equal]))
-            print(SortedSet(sol1) - SortedSet(sol2))
-            print(SortedSet(sol2) - SortedSet(sol1))
-            return self.Multiple
+            return MultipleSolutions(
+                self.var_smt2lits(sol[0]), self.var_smt2lits(sol[1])
+            )
 
-    # This is the same as 'solve', but checks if there are many solutions,
-    # returning Solver.Multiple if there is more than one solution
+    # Return the literals which take the same value in every solution, or
+    # None if there is no solution
     def solveAll(self, assume=tuple()):
         smtassume = [self._varlit2smtmap[l] for l in assume]
         sol = self._solveAll(smtassume)
+        if sol is None:
+            return None
         return self.var_smt2lits(sol)
 
     # Return a subset of 'lits' which forms a core, or
     # None if no core exists (or can be proved in the time limit)
     def basicCore(self, lits):
         self._corecount += 1
+        self._lastmodel = None
+        core = self._corecache.find(lits)
+        if core is not None:
+            self._stats["coreCacheHits"] += 1
+            return core
+        self._stats["coreCacheMisses"] += 1
+        if self._modelcache.check(lits):
+            self._stats["modelCacheHits"] += 1
+            return None
+        self._stats["modelCacheMisses"] += 1
         solve = self._solver.solveLimited(lits)
-        if solve is True or solve is None:
+        if solve is True:
+            self._lastmodel = self._solver.get_model()
+            self._modelcache.add(self._lastmodel)
+            return None
+        if solve is None:
             return None
         if EXPCONFIG["useUnsatCores"]:
             core = self._solver.unsat_core()
-            assert SortedSet(core).issubset(SortedSet(lits))
+            if EXPCONFIG["debugChecks"]:
+                assert SortedSet(core).issubset(SortedSet(lits))
         else:
             core = lits
+        self._corecache.add(core)
         return core
 
+    # The model (in pysat's format) which showed the last basicCore query
+    # was satisfiable, or None if it was not (or was answered by a cache)
+    def lastModel(self):
+        return self._lastmodel
+
     def addLit(self, lit):
-        if lit not in self._knownlits:
+        if lit not in self._knownset:
             self._solver.addLit(self._varlit2smtmap[lit])
             self._knownlits.append(lit)
+            self._knownset.add(lit)
+            # Old models may not satisfy the new literal
+            self._modelcache.clear()
 
     def getKnownLits(self):
         return self._knownlits
@@ -277,20 +492,43 @@ class Solver:
     # Storing and restoring assignments
     def push(self):
         self._solver.push()
-        self._stackknownlits.append(copy.deepcopy(self._knownlits))
+        self._stackknownlits.append(len(self._knownlits))
 
     def pop(self):
         self._solver.pop()
-        self._knownlits = self._stackknownlits.pop()
+        mark = self._stackknownlits.pop()
+        self._knownset.difference_update(self._knownlits[mark:])
+        del self._knownlits[mark:]
+        # Cores may depend on literals which are no longer known
+        self._corecache.clear()
 
     def explain(self, c):
         return c.explain(self._knownlits)
 
+    def set_phase(self, phase):
+        self._solver.set_phase(phase)
+
     def reset_stats(self):
         self._solver.reset_stats()
+        self._stats = {
+            "modelCacheHits": 0,
+            "modelCacheMisses": 0,
+            "coreCacheHits": 0,
+            "coreCacheMisses": 0
+        }
 
     def get_stats(self):
-        return copy.deepcopy(self._solver.get_stats())
+        stats = copy.deepcopy(self._solver.get_stats())
+        stats.update(self._stats)
+        return stats
 
     def add_stats(self, d):
         self._solver.add_stats(d)
+        for k in self._stats:
+            self._stats[k] += d[k]
+
+    def take_tuning(self):
+        return self._solver.take_tuning()
+
+    def add_tuning(self, tunings):
+        self._solver.add_tuning(tunings)
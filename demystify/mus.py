@@ -1,9 +1,11 @@
 import copy
+import itertools
 import math
 import logging
 import sys
 import math
 import multiprocessing
+import numpy
 
 from sortedcontainers import *
 
@@ -11,49 +13,250 @@ from .utils import flatten, randomFromSeed, safepow
 from .config import EXPCONFIG
 from .parallel import getPool, setChildSolver, getChildSolver
 from .musdict import MusDict
+from .scheduler import LiteralScheduler
 
 
 # This calculates Minimum Unsatisfiable Sets
 # It uses internals from solver, but is put in another file just for "neatness"
 
+
+class CoreArray:
+    """
+    A core (a list of SAT literals) which is being shrunk by removing one
+    literal at a time. The literals are kept in a numpy array, with a mask
+    of which are still present, so checking and removing literals is O(1)
+    and the list of the other literals (to pass to the SAT solver) is
+    built by numpy, rather than by copying and editing lists.
+    """
+
+    def __init__(self, lits):
+        self._lits = numpy.array(lits, dtype=numpy.int64)
+        self._present = numpy.ones(len(self._lits), dtype=bool)
+        self._pos = {l: i for (i, l) in enumerate(lits)}
+        self._size = len(self._pos)
+
+    def __len__(self):
+        return self._size
+
+    def __contains__(self, lit):
+        i = self._pos.get(lit)
+        return i is not None and self._present[i]
+
+    # The literals still present, except 'lit'
+    def without(self, lit):
+        i = self._pos[lit]
+        self._present[i] = False
+        ret = self._lits[self._present].tolist()
+        self._present[i] = True
+        return ret
+
+    def tolist(self):
+        return self._lits[self._present].tolist()
+
+
+# Look for a core in the neighbourhoods of 'assume' of radius 1, 2, 3 and
+# so on, stopping at the first which gives a core. A radius is only tried
+# when its neighbourhood is at least twice the size of the last one
+# tried, so the number of SAT calls grows with the log of the size of the
+# core's neighbourhood. If the neighbourhoods stop growing before a core
+# is found, try all constraints.
+def growingCore(solver, assume, smtassume):
+    tried = 0
+    size = 0
+    for radius in itertools.count(1):
+        cons = list(
+            itertools.chain.from_iterable(
+                solver.neighbourhood(l, radius) for l in assume
+            )
+        )
+        if len(cons) == size:
+            break
+        size = len(cons)
+        if size >= 2 * tried:
+            core = solver.basicCore(smtassume + cons)
+            if core is not None:
+                logging.debug("Core at radius %s, size %s", radius, size)
+                return core
+            tried = size
+    if tried < len(solver._conlits):
+        return solver.basicCore(smtassume + list(solver._conlits))
+    return None
+
+
+# Look for a MUS for 'assume' with at most 'badlimit' constraints, using
+# the constraints within 'distance' of assume (1 or 2), all constraints
+# (any other distance), or growingCore (distance None)
 def tinyMUS(solver, assume, distance, badlimit, config):
+    if distance is None:
+        solver.set_phase("tinyMUSgrowing")
+    else:
+        solver.set_phase("tinyMUS{}".format(distance))
     smtassume = [solver._varlit2smtmap[l] for l in assume]
-    if distance == 1:
-        cons = flatten([solver._varlit2con[l] for l in assume])
-    elif distance == 2:
-        cons = flatten([solver._varlit2con2[l] for l in assume])
+    if distance is None:
+        core = growingCore(solver, assume, smtassume)
     else:
-        cons = list(solver._conlits)
-
-    core = solver.basicCore(smtassume + cons)
+        if distance in (1, 2):
+            cons = flatten([solver.neighbourhood(l, distance) for l in assume])
+        else:
+            cons = list(solver._conlits)
+        core = solver.basicCore(smtassume + cons)
     if core is None:
         return None
 
+    rotate = config["modelRotation"] and solver.canRotate()
     corecpy = list(core)
+    core = CoreArray(core)
     badcount = 1
+    criticals = []
     for lit in corecpy:
-        if lit in core and len(core) > 2:
-            to_test = list(core)
-            to_test.remove(lit)
-            newcore = solver.basicCore(to_test)
+        if lit in core and lit not in criticals and len(core) > 2:
+            newcore = solver.basicCore(core.without(lit))
             if newcore is not None:
-                core = newcore
+                core = CoreArray(newcore)
             else:
-                badcount += 1
+                criticals.append(lit)
+                model = solver.lastModel()
+                if rotate and model is not None:
+                    criticals.extend(
+                        rotateModel(
+                            solver, model, lit, core, smtassume, criticals,
+                            badlimit - 1
+                        )
+                    )
+                badcount = 1 + len(criticals)
                 if badcount > badlimit:
                     logging.debug("ZZFail %s %s %s", lit, len(core), badcount)
                     return None
 
     logging.debug("ZZPass %s %s %s", lit, len(core), badcount)
-    return [solver._conmap[x] for x in core if x in solver._conmap]
+    return [solver._conmap[x] for x in core.tolist() if x in solver._conmap]
+
+
+# Raised by quickXplain when the MUS is going to be bigger than minsize
+class _TooBig(Exception):
+    pass
+
+
+# Raised by quickXplain when its 'cancel' returns True
+class _Cancelled(Exception):
+    pass
+
+
+# Shrink 'cons' to a MUS, with the QuickXplain divide and conquer algorithm.
+# smtassume and cons together must be unsatisfiable. Each recursive call
+# is given a satisfiable 'background' which is unsatisfiable with 'cons',
+# and returns a subset of 'cons' which, with 'background', is still
+# unsatisfiable. When adding half of 'cons' to the background makes it
+# unsatisfiable, the other half is not needed, and the half is narrowed to
+# the constraints in the unsat core before going on.
+# This needs O(k log(n/k)) SAT calls for a MUS of size k, rather than O(n)
+# for deleting one constraint at a time. Returns None if the MUS has more
+# than 'minsize' constraints, or if 'cancel' (checked before each SAT
+# call, as in MUS) returns True.
+def quickXplain(solver, smtassume, cons, minsize, cancel=None):
+    found = [0]
+
+    # The unsat core of smtassume + background, or None if it is satisfiable
+    def check(background):
+        if cancel is not None and cancel():
+            raise _Cancelled()
+        return solver.basicCore(smtassume + background)
+
+    def qx(background, cons):
+        if len(cons) == 0:
+            return []
+        if len(cons) == 1:
+            # Every constraint returned here is in the final MUS
+            found[0] += 1
+            if found[0] > minsize:
+                raise _TooBig()
+            return cons
+        half = len(cons) // 2
+        (first, second) = (cons[:half], cons[half:])
+        core = check(background + first)
+        if core is not None:
+            core = set(core)
+            return qx(background, [c for c in first if c in core])
+        second = qx(background + first, second)
+        if check(background + second) is not None:
+            return second
+        first = qx(background + second, first)
+        return first + second
+
+    try:
+        return qx([], cons)
+    except (_TooBig, _Cancelled):
+        return None
+
+
+# Recursive model rotation. 'model' (from Solver.lastModel) satisfies the
+# known literals, smtassume and every constraint in 'core' except 'con',
+# which shows 'con' is in every MUS inside 'core' (it is critical).
+# Flipping a variable in the clauses of 'con' which the model falsifies
+# can give a model which satisfies 'con' and falsifies exactly one other
+# constraint in 'core', which is then also critical. We repeat this from
+# each new critical, so finding them needs no more SAT calls. Returns the
+# criticals found which are not 'con' or in 'criticals', stopping once
+# more than 'limit' criticals are known.
+def rotateModel(solver, model, con, core, smtassume, criticals, limit):
+    groups = solver._clausegroups
+    occurs = solver._occurs
+    # 'con' may be one of smtassume, rather than a constraint
+    if con not in groups:
+        return []
+    fixed = set(
+        abs(x) for x in itertools.chain(smtassume, solver._solver._knownlits)
+    )
+    seen = set(criticals)
+    seen.add(con)
+    found = []
+    # The models are lists where m[l] says if literal l is true. Negative
+    # literals index from the end of the list, so their entries are
+    # m[-v] = m[len(m) - v].
+    m = solver._solver.satassignment2array(model)
+    m = numpy.concatenate((m > 0, (m < 0)[:0:-1])).tolist()
+    todo = [(m, con)]
+    while len(todo) > 0 and len(seen) <= limit:
+        (m, con) = todo.pop()
+        value = m.__getitem__
+        falsified = [c for c in groups[con] if not any(map(value, c))]
+        flips = set(abs(l) for c in falsified for l in c)
+        for v in flips:
+            if v in fixed or v in groups:
+                continue
+            old = v if m[v] else -v
+            # The flip must satisfy every falsified clause of 'con'
+            if not all(-old in c for c in falsified):
+                continue
+            (m[v], m[-v]) = (m[-v], m[v])
+            broken = None
+            for (g, c) in occurs.get(old, ()):
+                if g != 0 and g != con and (g == broken or g not in core):
+                    continue
+                if any(map(value, c)):
+                    continue
+                if g == 0 or g == con or broken is not None:
+                    broken = None
+                    break
+                broken = g
+            if broken is not None and broken not in seen:
+                seen.add(broken)
+                found.append(broken)
+                todo.append((list(m), broken))
+            (m[v], m[-v]) = (m[-v], m[v])
+    return found
 
 
 count = 0
 
 
+# 'cancel', if given, is called between SAT calls, and the search gives
+# up (returning None) as soon as it returns True
 def MUS(
-        r, solver, assume, minsize, *, config, initial_cons=None, just_check=False
+        r, solver, assume, minsize, *, config, initial_cons=None, just_check=False,
+        cancel=None
 ):
+    solver.set_phase("MUS")
     smtassume = [solver._varlit2smtmap[a] for a in assume]
 
     if EXPCONFIG["dumpSAT"]:
@@ -68,7 +271,7 @@ def MUS(
     if initial_cons is None:
         if config["checkCloseFirst"]:
             closecons = SortedSet(
-                flatten([solver._varlit2con[l] for l in assume])
+                flatten([solver.neighbourhood(l, 1) for l in assume])
             )
             farcons = solver._conlits - closecons
             cons = r.sample(closecons, len(closecons)) + r.sample(
@@ -98,6 +301,8 @@ def MUS(
     if config["prechopMUSes12"]:
         step = int(len(core) * (0.8))
         while step > 1 and len(core) > minsize:
+            if cancel is not None and cancel():
+                return None
             to_test = core[:-step]
             newcore = solver.basicCore(smtassume + to_test)
             if newcore is not None:
@@ -139,6 +344,8 @@ def MUS(
         if loopsize <= 10:
             done = False
             for tries in range(loopsize):
+                if cancel is not None and cancel():
+                    return None
                 r.shuffle(core)
                 newcore = solver.basicCore(smtassume + core[:-step])
                 if newcore is not None:
@@ -163,6 +370,8 @@ def MUS(
             i = 0
             badcount = 0
             while i * step < len(core):
+                if cancel is not None and cancel():
+                    return None
                 to_test = core[: (i * step)] + core[((i + 1) * step):]
                 solvable = solver._solver.solveLimited(smtassume + to_test)
                 logging.debug(
@@ -197,6 +406,8 @@ def MUS(
             i = 0
             badcount = 0
             while i * step < len(core):
+                if cancel is not None and cancel():
+                    return None
                 to_test = core[: (i * step)] + core[((i + 1) * step):]
                 solvable = solver._solver.solveLimited(smtassume + to_test)
                 logging.debug(
@@ -247,6 +458,8 @@ def MUS(
             # Stage 1: Look for something to delete
             solvable = False
             while not solvable:
+                if cancel is not None and cancel():
+                    return None
                 logging.debug("Core step up: %s %s %s", pos, len(core), step)
                 if pos >= len(core):
                     logging.debug(
@@ -309,31 +522,66 @@ def MUS(
                         if x in solver._conmap
                     ]
 
+    if config["quickXplainMUS"]:
+        cons = [x for x in core if x in solver._conmap]
+        core = quickXplain(solver, smtassume, cons, minsize, cancel)
+        if core is None:
+            logging.debug("QuickXplain failed: %s %s", assume, minsize)
+            return None
+        logging.info("QuickXplain found: %s %s %s", assume, lens, len(core))
+        return [solver._conmap[x] for x in core]
+
     # Final cleanup
     # We need to be prepared for things to disappear as we reduce the core, so 
     # make a copy and iterate through that.
+    # Constraints we failed to remove are 'criticals', and are never tried
+    # again. With modelRotation, each model which shows a constraint is
+    # critical is used to look for more criticals.
+    rotate = config["modelRotation"] and solver.canRotate()
     stepcount = 0
     badcount = 0
+    criticals = []
     corecpy = list(core)
+    core = CoreArray(core)
     for lit in corecpy:
-        if lit in core:
+        if lit in core and lit not in criticals:
+            if cancel is not None and cancel():
+                logging.debug("Core cancelled: %s %s", assume, stepcount)
+                return None
             logging.debug("Trying to remove %s", lit)
-            to_test = list(core)
-            to_test.remove(lit)
-            newcore = solver.basicCore(smtassume + to_test)
+            newcore = solver.basicCore(smtassume + core.without(lit))
             stepcount += 1
             if newcore is not None:
                 logging.debug("Can remove: %s", lit)
-                core = newcore
+                core = CoreArray(newcore)
                 lens.append((lit, len(core)))
             else:
                 logging.debug("Failed to remove: %s (%s of %s)", lit, badcount, minsize)
-                badcount += 1
+                criticals.append(lit)
+                model = solver.lastModel()
+                if rotate and model is not None:
+                    rotated = rotateModel(
+                        solver, model, lit, core, smtassume, criticals, minsize
+                    )
+                    logging.debug("Rotation found %s criticals", len(rotated))
+                    criticals.extend(rotated)
+                badcount = len(criticals)
+
+                if badcount > minsize:
+                    logging.debug(
+                        "Core failed: %s %s %s %s",
+                        assume,
+                        minsize,
+                        badcount,
+                        stepcount,
+                    )
+                    return None
 
                 if badcount == minsize:
-                    cutcore = core[:minsize]
-                    # Check if the core is already minimal first
-                    if cutcore != core and (
+                    # The criticals are in every MUS inside the core, so
+                    # either they are the MUS, or it is too big
+                    cutcore = criticals
+                    if len(cutcore) != len(core) and (
                                 solver._solver.solve(smtassume + cutcore, getsol=False)
                                 != False
                     ):
@@ -370,15 +618,23 @@ def MUS(
         minsize,
 
     )
-    return [solver._conmap[x] for x in core if x in solver._conmap]
+    return [solver._conmap[x] for x in core.tolist() if x in solver._conmap]
 
 
 def _parfunc_dotinymus(args):
     (p, distance, badlimit, config) = args
-    return (p, tinyMUS(getChildSolver(), [p.neg()], distance, badlimit, config))
+    solver = getChildSolver()
+    calls = solver.get_stats()["solveCount"]
+    mus = tinyMUS(solver, [p.neg()], distance, badlimit, config)
+    return (p, mus, solver.get_stats()["solveCount"] - calls)
 
 
-def getTinyMUSes(solver, puzlits, musdict, *, distance, repeats, badlimit, config):
+# With a LiteralScheduler, the literals are started in its order, and it
+# is told how many SAT calls each took
+def getTinyMUSes(
+        solver, puzlits, musdict, *, distance, repeats, badlimit, config,
+        scheduler=None
+):
     setChildSolver(solver)
     logging.info(
         "Getting tiny MUSes, distance %s, for %s puzlits, %s repeats",
@@ -386,13 +642,57 @@ def getTinyMUSes(solver, puzlits, musdict, *, distance, repeats, badlimit, confi
         len(puzlits),
         repeats,
     )
+    if scheduler is not None:
+        puzlits = scheduler.order(puzlits)
     with getPool(config["cores"]) as pool:
         res = pool.map(
             _parfunc_dotinymus,
             [(p, distance, badlimit, config) for r in range(repeats) for p in puzlits],
+            ordered=scheduler is not None,
         )
-        for (p, mus) in res:
+        for (p, mus, cost) in res:
             musdict.update(p, mus)
+            if scheduler is not None:
+                scheduler.record(p, mus, cost)
+
+
+# Find the MUSes of size 0 and 1 which unit propagation can prove: the
+# known literals imply p, or they do with one constraint. Only the
+# constraints next to some literal are tried, each once. Returns the
+# literals in puzlits which were not given a MUS.
+def getPropagateMUSes(solver, puzlits, musdict):
+    implied = solver.propagate(cons=[])
+    if implied is None:
+        return list(puzlits)
+    implied = set(implied)
+    remaining = []
+    for p in puzlits:
+        if p in implied:
+            musdict.update(p, [])
+        else:
+            remaining.append(p)
+
+    remainingset = set(remaining)
+    near = SortedSet(
+        itertools.chain.from_iterable(solver.neighbourhood(p.neg(), 1) for p in remaining)
+    )
+    for cvar in near:
+        con = solver._conmap[cvar]
+        implied = solver.propagate(cons=[con])
+        if implied is None:
+            continue
+        for p in implied:
+            # Only keep the first MUS for each literal, like tinyMUS
+            if p in remainingset:
+                musdict.update(p, [con])
+                remainingset.remove(p)
+
+    logging.info(
+        "Propagation found MUSes for %s of %s puzlits",
+        len(puzlits) - len(remainingset),
+        len(puzlits),
+    )
+    return [p for p in remaining if p in remainingset]
 
 
 def _parfunc_docheckmus(args):
@@ -443,58 +743,174 @@ def _parfunc_dochecklitsmus(args):
 
 # Check which literals are filtered by a particular MUS
 def checkWhichLitsAMUSProves(solver, puzlits, mus, config):
+    # Literals which unit propagation proves do not need a SAT call
+    proven = []
+    if solver.canPropagate():
+        implied = solver.propagate(cons=mus)
+        if implied is not None:
+            implied = set(implied)
+            proven = [p for p in puzlits if p in implied]
+            puzlits = [p for p in puzlits if p not in implied]
     setChildSolver(solver)
     if len(puzlits) > 0:
         with getPool(config["cores"]) as pool:
             res = pool.map(_parfunc_dochecklitsmus, [(p, mus, config) for p in puzlits])
-            return list(p for (p, musvalid) in res if musvalid)
+            return proven + list(p for (p, musvalid) in res if musvalid)
     else:
-        return []
+        return proven
+
+
+class CorePool:
+    """
+    The most recent MUSes (as lists of constraint SAT literals) found by
+    cascadeMUS, shared between the processes of a pool, so it must be
+    created before the pool starts. Stores the last SLOTS MUSes with at
+    most WIDTH constraints, in one shared array: the number of MUSes ever
+    added, then for each slot its length and literals.
+    """
+
+    SLOTS = 32
+    WIDTH = 64
+
+    def __init__(self):
+        size = 1 + self.SLOTS * (self.WIDTH + 1)
+        self._data = multiprocessing.Array("i", size)
+
+    def add(self, core):
+        if len(core) > self.WIDTH:
+            return
+        with self._data.get_lock():
+            n = self._data[0]
+            self._data[0] = n + 1
+            start = 1 + (n % self.SLOTS) * (self.WIDTH + 1)
+            self._data[start] = len(core)
+            self._data[start + 1 : start + 1 + len(core)] = core
+
+    def cores(self):
+        with self._data.get_lock():
+            data = self._data[:]
+        ret = []
+        for i in range(min(data[0], self.SLOTS)):
+            start = 1 + i * (self.WIDTH + 1)
+            ret.append(data[start + 1 : start + 1 + data[start]])
+        return ret
 
 
 MUSSizeFound = None
 MUSSizeRequired = None
+SharedCores = None
+# The literals cascadeMUS is looking at, and a flag for each which is set
+# when a MUS found in the current round proves it
+CascadeLits = None
+LitsProved = None
 
 MAX_MUS = 999999999
 
 
+# Look for a MUS for 'p' inside the smallest shared MUS which contains a
+# constraint next to 'p'. These are often found for nearby literals, and
+# shrinking one is much cheaper than starting from every constraint.
+def _sharedCoreMUS(r, solver, p, minsize, config, cancel):
+    near = set(solver.neighbourhood(p.neg(), 1))
+    shared = [c for c in SharedCores.cores() if not near.isdisjoint(c)]
+    if len(shared) == 0:
+        return None
+    core = min(shared, key=len)
+    # The shared MUS is already small, so there is nothing to chop
+    return MUS(
+        r,
+        solver,
+        [p.neg()],
+        minsize,
+        config=dict(config, tryManyChopMUS=False),
+        initial_cons=[solver._conmap[x] for x in core],
+        cancel=cancel,
+    )
+
+
+# The literals of CascadeLits, other than number i, which unit propagation
+# shows 'mus' proves. These are marked in LitsProved (so their own searches
+# are skipped) only if 'mus' is small enough for the current round, as a
+# search for a literal proved by a bigger MUS could still find a smaller one.
+def _litsMUSProves(solver, i, mus):
+    implied = solver.propagate(cons=mus)
+    if implied is None:
+        return []
+    implied = set(implied)
+    mark = len(mus) <= MUSSizeRequired.value
+    proved = []
+    for (j, q) in enumerate(CascadeLits):
+        if j != i and q in implied:
+            if mark:
+                LitsProved[j] = 1
+            proved.append(q)
+    return proved
+
+
+# True once looking for a MUS for literal i of CascadeLits can no longer
+# change the result of the current round: either a small enough MUS has
+# been found (with earlyExit), or another MUS already proves the literal
+def _cascadeCancelled(i, config):
+    if config["earlyExit"] and MUSSizeFound.value <= MUSSizeRequired.value:
+        return True
+    return LitsProved[i] != 0
+
+
+# Tasks which are cancelled (including the ones still queued when a round
+# is decided, which return straight away) report a cost of None, as they
+# say nothing about how hard their literal is
 def _findSmallestMUS_func(tup):
-    (p, randstr, minsize, config) = tup
+    (p, i, randstr, minsize, config) = tup
 
     logging.debug("YY %s %s %s %s", MUSSizeFound.value, MUSSizeRequired.value, minsize, p)
 
-    if config["earlyExit"] and MUSSizeFound.value <= MUSSizeRequired.value:
-        logging.info("Early Exit!")
-        return (p, None)
+    if _cascadeCancelled(i, config):
+        logging.debug("Skipping, round already decided: %s", p)
+        return (p, None, [], None)
 
     # logging.info("Random str: '%s'", randstr)
-    (ret, mus) = (
-        p,
-        MUS(
-            randomFromSeed(randstr),
-            getChildSolver(),
-            [p.neg()],
-            minsize,
-            config=config,
-        ),
-    )
+    solver = getChildSolver()
+    calls = solver.get_stats()["solveCount"]
+    r = randomFromSeed(randstr)
+    cancel = lambda: _cascadeCancelled(i, config)
+    mus = None
+    if config["shareCores"]:
+        mus = _sharedCoreMUS(r, solver, p, minsize, config, cancel)
+    if mus is None:
+        mus = MUS(r, solver, [p.neg()], minsize, config=config, cancel=cancel)
+    if mus is None and cancel():
+        logging.info("Cancelled: %s", p)
+        return (p, None, [], None)
+    proved = []
     if mus is not None:
+        if config["shareCores"]:
+            SharedCores.add([solver._conlit2conmap[c] for c in mus])
+        if config["skipProvedLits"] and solver.canPropagate():
+            proved = _litsMUSProves(solver, i, mus)
         if len(mus) < MUSSizeFound.value:
             logging.info("Found new best MUS size: %s -> %s", MUSSizeFound.value, len(mus))
             MUSSizeFound.value = len(mus)
-    return (ret, mus)
+    return (p, mus, proved, solver.get_stats()["solveCount"] - calls)
 
 
-def cascadeMUS(solver, puzlits, repeats, musdict, config):
+# With a LiteralScheduler, the literals are started in its order (so with
+# earlyExit, the least promising are skipped), and it is told how many
+# SAT calls each took
+def cascadeMUS(solver, puzlits, repeats, musdict, config, scheduler=None):
     # We need this to be accessible by the pool
     setChildSolver(solver)
-    global MUSSizeFound, MUSSizeRequired
+    global MUSSizeFound, MUSSizeRequired, SharedCores, CascadeLits, LitsProved
     if musdict.minimum() < math.inf:
         MUSSizeFound = multiprocessing.Value('l', musdict.minimum())
     else:
         MUSSizeFound = multiprocessing.Value('l', MAX_MUS)
 
     MUSSizeRequired = multiprocessing.Value('l', 111)
+    SharedCores = CorePool()
+    if scheduler is not None:
+        puzlits = scheduler.order(puzlits)
+    CascadeLits = list(puzlits)
+    LitsProved = multiprocessing.Array('b', len(CascadeLits))
 
     def inner_loop(minsize, pool):
         logging.info("Looking for %s (know %s)", minsize, MUSSizeFound.value)
@@ -512,20 +928,27 @@ def cascadeMUS(solver, puzlits, repeats, musdict, config):
             len(puzlits),
             minsize,
         )
+        LitsProved[:] = [0] * len(CascadeLits)
         res = pool.map(
             _findSmallestMUS_func,
             [
                 (
                     p,
+                    i,
                     "{}:{}:{}".format(r, p, minsize),
                     minsize * config["cascadeMult"],
                     config,
                 )
                 for r in range(repeats)
-                for p in puzlits
+                for (i, p) in enumerate(CascadeLits)
             ],
+            ordered=scheduler is not None,
         )
-        for (p, mus) in res:
+        for (p, mus, proved, cost) in res:
+            for q in proved:
+                musdict.update(q, mus)
+            if scheduler is not None and cost is not None:
+                scheduler.record(p, mus, cost)
             if mus is not None and len(mus) < minsize:
                 logging.info(
                     "!! Found smaller !!!! {} {}".format(
@@ -560,40 +983,81 @@ class CascadeMUSFinder:
     def __init__(self, solver, *, config):
         self.config = config
         self._solver = solver
+        self._solver.init_litmappings()
+        # Build the clause groups now, so worker processes share them
+        if config["modelRotation"]:
+            self._solver.canRotate()
         self._bestcache = MusDict({})
+        if config["literalScheduler"]:
+            self._scheduler = LiteralScheduler()
+        else:
+            self._scheduler = None
 
     def smallestMUS(self, puzlits):
+        musdict = self._smallestMUS(puzlits)
+        if self._scheduler is not None:
+            self._scheduler.endStep(musdict)
+        return musdict
+
+    def _smallestMUS(self, puzlits):
         musdict = MusDict({})
-        if self.config["checkSmall1"]:
-            logging.info("Doing checkSmall1")
+        # Literals which still need checkSmall1 (or adaptiveRadius)
+        tinylits = puzlits
+        if self.config["checkPropagate"] and self._solver.canPropagate():
+            logging.info("Doing checkPropagate")
+            tinylits = getPropagateMUSes(self._solver, puzlits, musdict)
+            # Size 1 MUSes which propagation cannot see will be found in a
+            # later step
+            if musdict.minimum() <= 1 and self.config["earlyExit"]:
+                logging.info("Early exit from checkPropagate")
+                return musdict
+
+        if self.config["adaptiveRadius"]:
+            # This replaces checkSmall1 and the general search below
+            logging.info("Looking for small, in growing neighbourhoods")
             getTinyMUSes(
                 self._solver,
-                puzlits,
+                tinylits,
                 musdict,
                 repeats=self.config["smallRepeats"],
-                distance=1,
-                badlimit=3,
-                config=self.config
+                distance=None,
+                badlimit=self.config["baseSizeMUS"] * 2,
+                config=self.config,
+                scheduler=self._scheduler
             )
+        else:
+            if self.config["checkSmall1"]:
+                logging.info("Doing checkSmall1")
+                getTinyMUSes(
+                    self._solver,
+                    tinylits,
+                    musdict,
+                    repeats=self.config["smallRepeats"],
+                    distance=1,
+                    badlimit=3,
+                    config=self.config,
+                    scheduler=self._scheduler
+                )
 
-        logging.info("Smallest MUS A: %s ", musdict.minimum())
+            logging.info("Smallest MUS A: %s ", musdict.minimum())
 
-        # Early exit for trivial case
-        if musdict.minimum() <= 1 and self.config["earlyExit"]:
-            logging.info("Early exit from checkSmall1")
-            return musdict
+            # Early exit for trivial case
+            if musdict.minimum() <= 1 and self.config["earlyExit"]:
+                logging.info("Early exit from checkSmall1")
+                return musdict
 
-        # Try looking for general tiny MUSes, to prime search
-        logging.info("Looking for small")
-        getTinyMUSes(
-            self._solver,
-            puzlits,
-            musdict,
-            repeats=self.config["smallRepeats"],
-            distance=999,
-            badlimit=self.config["baseSizeMUS"] * 2,
-            config=self.config
-        )
+            # Try looking for general tiny MUSes, to prime search
+            logging.info("Looking for small")
+            getTinyMUSes(
+                self._solver,
+                puzlits,
+                musdict,
+                repeats=self.config["smallRepeats"],
+                distance=999,
+                badlimit=self.config["baseSizeMUS"] * 2,
+                config=self.config,
+                scheduler=self._scheduler
+            )
 
         logging.info("Smallest MUS B: %s ", musdict.minimum())
 
@@ -607,7 +1071,7 @@ class CascadeMUSFinder:
         if EXPCONFIG["useCache"]:
             checkMUS(self._solver, puzlits, self._bestcache, musdict, self.config)
 
-        if self.config["checkSmall2"]:
+        if self.config["checkSmall2"] and not self.config["adaptiveRadius"]:
             logging.info("Doing checkSmall2")
             getTinyMUSes(
                 self._solver,
@@ -616,7 +1080,8 @@ class CascadeMUSFinder:
                 repeats=self.config["smallRepeats"],
                 distance=2,
                 badlimit=5,
-                config=self.config
+                config=self.config,
+                scheduler=self._scheduler
             )
 
         # Early exit for trivial case
@@ -626,7 +1091,14 @@ class CascadeMUSFinder:
             return musdict
 
         logging.info("Running cascade algorithm")
-        cascadeMUS(self._solver, puzlits, self.config["repeats"], musdict, self.config)
+        cascadeMUS(
+            self._solver,
+            puzlits,
+            self.config["repeats"],
+            musdict,
+            self.config,
+            scheduler=self._scheduler,
+        )
 
         logging.info("Finished CascadeMUS: Found %s", musdict.minimum())
 
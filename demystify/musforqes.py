@@ -6,7 +6,7 @@ import math
 from sortedcontainers import *
 from pysat.formula import WCNF
 
-from .mus import getTinyMUSes
+from .mus import getTinyMUSes, getPropagateMUSes
 from .optuxext import OptUxExt
 from .utils import flatten
 from .musdict import MusDict
@@ -28,6 +28,7 @@ class ForqesMUSFinder:
     def __init__(self, solver, *, config):
         self.config = config
         self._solver = solver
+        self._solver.init_litmappings()
         self._bestcache = {}
 
         # The constraint selectors
@@ -63,12 +64,21 @@ class ForqesMUSFinder:
         """
         musdict = MusDict({})
 
+        # Check for MUSes of size 0 and 1 with unit propagation
+        tinylits = puzlits
+        if self.config["checkPropagate"] and self._solver.canPropagate():
+            logging.info("Doing checkPropagate")
+            tinylits = getPropagateMUSes(self._solver, puzlits, musdict)
+            if musdict.minimum() <= 1:
+                logging.info("Early exit from checkPropagate")
+                return musdict
+
         # Heuristic check for MUSes of size 1.
         if self.config["checkSmall1"]:
             logging.info("Doing checkSmall1")
             getTinyMUSes(
                 self._solver,
-                puzlits,
+                tinylits,
                 musdict,
                 repeats=self.config["smallRepeats"],
                 distance=1,
@@ -146,7 +156,7 @@ def MUS(solver, forqes, assume, config, maxSize=float("inf")):
     assume = [solver._varlit2smtmap[a] for a in assume]
 
     # The solution values we have already explained
-    known = [k for k in solver._solver._knownlits]
+    known = sorted(solver._solver._knownlits)
 
     # FORQES
     if forqes.initialise(assume, known, maxSize=maxSize):
@@ -46,7 +46,7 @@ class FakePool:
     def __init__(self):
         pass
 
-    def map(self, func, args):
+    def map(self, func, args, *, ordered=False):
         return list(map(func, args))
 
     def __enter__(self):
@@ -86,6 +86,8 @@ def doprocess(id, inqueue, outqueue):
     count = 0
     # logging.info("start child stats: %s", _global_solver_ref.get_stats())
     _global_solver_ref.reset_stats()
+    # Only send back tuning learnt in this process
+    _global_solver_ref.take_tuning()
     # logging.info("reset child stats: %s", _global_solver_ref.get_stats())
     while True:
         # print("! {} Waiting for task".format(id))
@@ -94,7 +96,12 @@ def doprocess(id, inqueue, outqueue):
         if func is None:
             if msg == "stats":
                 # logging.info("get child stats: %s", _global_solver_ref.get_stats())
-                outqueue.put({"stats": _global_solver_ref.get_stats()})
+                outqueue.put(
+                    {
+                        "stats": _global_solver_ref.get_stats(),
+                        "tuning": _global_solver_ref.take_tuning(),
+                    }
+                )
                 _global_solver_ref.reset_stats()
             elif msg is None:
                 break
@@ -114,11 +121,17 @@ class ProcessPool:
         self._reuse = reuse
         self._first = True
 
-    def map(self, func, args):
+    # With 'ordered', the tasks are dealt out to the processes in turn,
+    # so the first tasks in 'args' are started first
+    def map(self, func, args, *, ordered=False):
         # Make this repeatable, but shuffled differently on each call
-        randomFromSeed(getGlobalProcessCounter()).shuffle(args)
-        # TODO: This can be unbalanced
-        chunks = split(args, self._processcount)
+        r = randomFromSeed(getGlobalProcessCounter())
+        if ordered:
+            chunks = [args[i::self._processcount] for i in range(self._processcount)]
+        else:
+            r.shuffle(args)
+            # TODO: This can be unbalanced
+            chunks = split(args, self._processcount)
         logging.info("Chunked %s in %s", len(args), [len(c) for c in chunks])
         # print("!A ", chunks)
         # Push all the work
@@ -181,10 +194,15 @@ class ProcessPool:
         # print("!! exiting")
         for q in self._inqueues:
             q.put((None, "stats"))
+        tunings = []
         for q in self._outqueues:
             s = q.get()
             # logging.info("child stats: %s", s)
             _global_solver_ref.add_stats(s["stats"])
+            tunings.append(s["tuning"])
+        # Keep what the children learnt about budgets and reboots, for
+        # the next pool
+        _global_solver_ref.add_tuning(tunings)
         if not self._reuse:
             self.cleanup()
         return False
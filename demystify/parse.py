@@ -84,9 +84,11 @@ def parse_essence(eprime, eprimeparam):
         
         params = json.loads(paramstr)
     except Exception as e:
-        print("Failed JSON parsing of Conjure output:")
-        print(paramjson.stdout.decode("utf-8"))
-        print(e)
+        logging.error(
+            "Failed JSON parsing of Conjure output:\n%s\n%s",
+            paramjson.stdout.decode("utf-8"),
+            e,
+        )
         raise
 
     tdir = None
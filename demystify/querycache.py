@@ -0,0 +1,157 @@
+# Caches which let Solver answer some queries without calling the SAT solver
+
+import collections
+import numpy
+
+
+class QueryCache:
+    """
+    Checking and filling a cache costs time, so a cache stops being used
+    if, after WARMUP lookups, it answers less than 'minhitrate' of them.
+    """
+
+    # How many lookups to do before deciding if the cache is useful
+    WARMUP = 500
+
+    def __init__(self, size, minhitrate=0):
+        self._size = size
+        self._minhitrate = minhitrate
+        self._checks = 0
+        self._hits = 0
+        self.clear()
+
+    def active(self):
+        return self._size > 0 and (
+            self._checks < self.WARMUP
+            or self._hits >= self._minhitrate * self._checks
+        )
+
+    def _record(self, hit):
+        self._checks += 1
+        if hit:
+            self._hits += 1
+
+
+class ModelCache(QueryCache):
+    """
+    Stores the most recent models found by the SAT solver, as packed bit
+    arrays (one row per model). A query (a list of SAT literals which
+    must all be true) is satisfiable if any stored model satisfies all the
+    literals, which we check for every model at once with numpy.
+    """
+
+    def clear(self):
+        # Number of bits stored per model
+        self._width = 0
+        self._models = numpy.zeros((self._size, 0), dtype=numpy.uint8)
+        # Number of variables each stored model gives a value to
+        self._widths = numpy.zeros(self._size, dtype=numpy.int64)
+        # How many rows of _models are filled, and the next row to replace
+        self._count = 0
+        self._next = 0
+
+    def __len__(self):
+        return self._count
+
+    def add(self, model):
+        if not self.active():
+            return
+        model = numpy.fromiter(model, dtype=numpy.int64, count=len(model))
+        width = int(numpy.abs(model).max()) + 1
+        if width > self._width:
+            # Make space for the new variables. Existing models do not give
+            # these a value, which is tracked in _widths.
+            self._width = width
+            grown = numpy.zeros(
+                (self._size, (width + 7) // 8), dtype=numpy.uint8
+            )
+            grown[:, : self._models.shape[1]] = self._models
+            self._models = grown
+        bits = numpy.zeros(self._models.shape[1] * 8, dtype=bool)
+        bits[model[model > 0]] = True
+        self._models[self._next] = numpy.packbits(bits)
+        self._widths[self._next] = width
+        self._next = (self._next + 1) % self._size
+        self._count = min(self._count + 1, self._size)
+
+    # Return True if some stored model satisfies every literal in 'lits'
+    def check(self, lits):
+        if self._count == 0 or not self.active():
+            return False
+        lits = numpy.fromiter(lits, dtype=numpy.int64, count=len(lits))
+        var = numpy.abs(lits)
+        maxvar = var.max() if len(lits) > 0 else 0
+        rows = numpy.nonzero(self._widths[: self._count] > maxvar)[0]
+        if len(rows) == 0:
+            self._record(False)
+            return False
+        # packbits stores the lowest bit index in the highest bit of a byte
+        packed = self._models[rows[:, None], var >> 3]
+        bits = (packed >> (7 - (var & 7)).astype(numpy.uint8)) & 1
+        hit = bool(numpy.any(numpy.all(bits == (lits > 0), axis=1)))
+        self._record(hit)
+        return hit
+
+
+class CoreCache(QueryCache):
+    """
+    Stores unsatisfiable cores found by the SAT solver. Any query which
+    contains all the literals of a stored core is also unsatisfiable, and
+    that core is a valid answer for it.
+
+    Each core is indexed under one of its literals (the one with the
+    fewest cores already indexed under it), so finding a subset of a
+    query only needs to look at cores indexed under literals of the query.
+    When more than 'size' cores are stored, the least recently used core
+    is removed.
+    """
+
+    def clear(self):
+        # Map from core to the literal it is indexed under, in LRU order
+        self._cores = collections.OrderedDict()
+        # Map from literal to the cores indexed under it
+        self._watches = {}
+
+    def __len__(self):
+        return len(self._cores)
+
+    def add(self, core):
+        if not self.active():
+            return
+        core = frozenset(core)
+        if core in self._cores:
+            self._cores.move_to_end(core)
+            return
+        # The empty core is stored under None, and checked for every query
+        if len(core) == 0:
+            watch = None
+        else:
+            watch = min(core, key=lambda l: len(self._watches.get(l, ())))
+        self._cores[core] = watch
+        self._watches.setdefault(watch, set()).add(core)
+        if len(self._cores) > self._size:
+            (oldcore, oldwatch) = self._cores.popitem(last=False)
+            self._watches[oldwatch].remove(oldcore)
+            if len(self._watches[oldwatch]) == 0:
+                del self._watches[oldwatch]
+
+    # Return a stored core which is a subset of 'lits' (in the same order
+    # as 'lits'), or None if there is no such core
+    def find(self, lits):
+        if len(self._cores) == 0 or not self.active():
+            return None
+        litset = set(lits)
+        if len(self._watches) < len(litset):
+            watched = [l for l in self._watches if l is None or l in litset]
+        else:
+            watched = [l for l in litset if l in self._watches]
+            if None in self._watches:
+                watched.append(None)
+        for l in watched:
+            for core in self._watches[l]:
+                if core <= litset:
+                    self._cores.move_to_end(core)
+                    self._record(True)
+                    return [x for x in lits if x in core]
+        self._record(False)
+        return None
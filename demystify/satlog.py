@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+
+# Record the queries made to the SAT solver, and replay them later.
+#
+# When EXPCONFIG["recordSAT"] is set to a filename prefix, each process
+# which uses a SATSolver writes everything it gives the SAT solver to
+# '<prefix>-<pid>-<n>.satlog', where n is a counter so each log gets its
+# own file. Replaying a log re-runs exactly the same SAT queries, without
+# any of the MUS finding code, so it can be used to compare SAT solvers
+# and their settings on a fixed benchmark. Times, both recorded and
+# replayed, are CPU time.
+#
+# A log is a sequence of records. Each record is a header of three
+# numbers (tag, length, extra) followed by 'length' 32-bit literals:
+#   BASE     (extra = number of variables) the solver was (re)built from
+#            these clauses, each followed by a 0
+#   CLAUSE   a clause was added to the solver
+#   SOLVE    (extra = propagation budget, or -1 for no budget) a solve,
+#            with these assumptions
+#   SAT / UNSAT / UNDECIDED (extra = CPU nanoseconds taken) the result of
+#            the previous solve, with the core for UNSAT
+
+import sys
+import os
+import argparse
+import struct
+import numpy
+
+from pysat.solvers import Solver
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.realpath(__file__))))
+
+from demystify.solvers.pysatimpl import supportsPropBudget
+from demystify.utils import get_cpu_time
+
+MAGIC = b"DEMYSTIFY-SATLOG-1\n"
+
+HEADER = struct.Struct("<iiq")
+
+(BASE, CLAUSE, SOLVE, SAT, UNSAT, UNDECIDED) = range(6)
+
+RESULTS = {True: SAT, False: UNSAT, None: UNDECIDED}
+
+
+class SATRecorder:
+    def __init__(self, filename, clauses, nvars):
+        # Unbuffered, so a forked process can never write out a copy of
+        # this process's buffer
+        self._file = open(filename, "wb", buffering=0)
+        self._file.write(MAGIC)
+        self.base(clauses, nvars)
+
+    def _write(self, tag, lits, extra=0):
+        lits = numpy.fromiter(lits, dtype=numpy.int32, count=len(lits))
+        self._file.write(HEADER.pack(tag, len(lits), extra) + lits.tobytes())
+
+    def base(self, clauses, nvars):
+        flat = [x for c in clauses for x in (*c, 0)]
+        self._write(BASE, flat, nvars)
+
+    def clause(self, clause):
+        self._write(CLAUSE, clause)
+
+    def solve(self, assumptions, budget):
+        self._write(SOLVE, assumptions, -1 if budget is None else budget)
+
+    def result(self, result, core, nanoseconds):
+        self._write(RESULTS[result], core if result is False else [], nanoseconds)
+
+    def close(self):
+        self._file.close()
+
+
+# Read a log, as a generator of (tag, lits, extra)
+def readSATLog(filename):
+    with open(filename, "rb") as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            raise ValueError("{} is not a SAT log".format(filename))
+        while True:
+            header = f.read(HEADER.size)
+            if len(header) < HEADER.size:
+                return
+            (tag, length, extra) = HEADER.unpack(header)
+            lits = numpy.frombuffer(f.read(4 * length), dtype=numpy.int32)
+            yield (tag, lits.tolist(), extra)
+
+
+def splitClauses(flat):
+    clauses = []
+    clause = []
+    for x in flat:
+        if x == 0:
+            clauses.append(clause)
+            clause = []
+        else:
+            clause.append(x)
+    return clauses
+
+
+def replaySATLog(filename, *, backend, budget=None):
+    """
+    Re-run the queries in a log on the pysat solver 'backend'. Each solve
+    uses the budget it was recorded with, unless 'budget' is given (where
+    0 means no budget). Returns a dictionary of statistics, comparing the
+    replay with what was recorded.
+    """
+    stats = {
+        "solveCount": 0,
+        "solveTime": 0,
+        "recordedTime": 0,
+        "undecidedCount": 0,
+        "recordedUndecidedCount": 0,
+        "coreSize": 0,
+        "recordedCoreSize": 0,
+        "mismatchCount": 0,
+    }
+    solver = None
+    result = None
+    for (tag, lits, extra) in readSATLog(filename):
+        if tag == BASE:
+            if solver is not None:
+                solver.delete()
+            solver = Solver(name=backend, bootstrap_with=splitClauses(lits))
+        elif tag == CLAUSE:
+            solver.add_clause(lits)
+        elif tag == SOLVE:
+            querybudget = extra if budget is None else budget
+            start_time = get_cpu_time()
+            if querybudget > 0 and supportsPropBudget(backend):
+                solver.prop_budget(querybudget)
+                result = solver.solve_limited(assumptions=lits)
+            else:
+                result = solver.solve(assumptions=lits)
+            stats["solveTime"] += get_cpu_time() - start_time
+            stats["solveCount"] += 1
+            if result is None:
+                stats["undecidedCount"] += 1
+            elif result is False:
+                stats["coreSize"] += len(solver.get_core())
+        else:
+            stats["recordedTime"] += extra / 1e9
+            if tag == UNDECIDED:
+                stats["recordedUndecidedCount"] += 1
+            elif tag == UNSAT:
+                stats["recordedCoreSize"] += len(lits)
+            # Answers can only disagree if both solves finished
+            recorded = tag == SAT
+            if tag != UNDECIDED and result is not None and result != recorded:
+                stats["mismatchCount"] += 1
+    if solver is not None:
+        solver.delete()
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Replay SAT logs written with EXPCONFIG['recordSAT']"
+    )
+    parser.add_argument("logs", type=str, nargs="+", help="SAT log files")
+    parser.add_argument(
+        "--solver", type=str, default="g4", help="pysat solver to replay with"
+    )
+    parser.add_argument(
+        "--budget",
+        type=int,
+        default=None,
+        help="Propagation budget for every solve (0 = no budget), "
+        "instead of the recorded budgets",
+    )
+    args = parser.parse_args()
+
+    for log in args.logs:
+        stats = replaySATLog(log, backend=args.solver, budget=args.budget)
+        print(log, stats)
+
+
+if __name__ == "__main__":
+    main()
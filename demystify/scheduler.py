@@ -0,0 +1,60 @@
+# Decide which order to look for MUSes for literals in, using what
+# happened in earlier steps
+
+import math
+
+
+class LiteralScheduler:
+    """
+    Remembers, for each literal, how looking for its MUSes went in earlier
+    steps: the size of its smallest MUS, the number of SAT calls spent on
+    it and how many steps in a row no MUS was found. MUS sizes change
+    slowly from one step to the next, so literals which had small MUSes
+    are looked at first. A literal for which no MUS was found forgets its
+    old MUS size.
+    With earlyExit, the later (usually slow and hopeless) literals are then
+    skipped once a small enough MUS is found. The cost of a literal is
+    counted in SAT calls rather than time, so the order is repeatable.
+    """
+
+    def __init__(self):
+        self._size = {}
+        self._cost = {}
+        self._failures = {}
+        # For the current step, map from literal to (cost, found a MUS)
+        self._step = {}
+
+    def _priority(self, lit):
+        return (
+            self._size.get(lit, math.inf),
+            self._failures.get(lit, 0),
+            self._cost.get(lit, 0),
+        )
+
+    # 'lits' sorted so the most promising come first. Literals with the
+    # same history keep their order.
+    def order(self, lits):
+        return sorted(lits, key=self._priority)
+
+    # Record one search for a MUS for 'lit', which found 'mus' (or None)
+    # with 'cost' SAT calls
+    def record(self, lit, mus, cost):
+        (oldcost, found) = self._step.get(lit, (0, False))
+        self._step[lit] = (oldcost + cost, found or mus is not None)
+
+    # Finish a step, where 'musdict' has the MUSes found for each literal
+    def endStep(self, musdict):
+        for (lit, (cost, found)) in self._step.items():
+            self._cost[lit] = cost
+            if found or musdict.contains(lit):
+                self._failures[lit] = 0
+            else:
+                self._failures[lit] = self._failures.get(lit, 0) + 1
+                # An old small MUS says nothing once the literal has failed
+                self._size.pop(lit, None)
+        for lit in musdict.keys():
+            self._size[lit] = len(musdict.get_first(lit))
+        self._step = {}
+
+    def __len__(self):
+        return len(self._size)
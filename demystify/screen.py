@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+
+# Check many instances for a unique solution, without explaining them.
+# This only builds the SAT model of each instance, skipping all the
+# MUS-finding machinery of Explainer.
+
+import sys
+import os
+import argparse
+import json
+import logging
+import time
+import multiprocessing
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.realpath(__file__))))
+
+from demystify.parse import parse_json, parse_essence, ParseError
+from demystify.internal import MultipleSolutions
+
+
+def screen_instance(instance):
+    """
+    Check one instance, which is either ("eprime", eprime, param) or
+    ("json", puzzle). Returns a dictionary describing the instance, where
+    "result" is one of "unsolvable", "unique" or "multiple", or which has
+    an "error" if the instance could not be checked.
+    """
+    if instance[0] == "eprime":
+        (_, eprime, param) = instance
+        ret = {"eprime": eprime, "param": param}
+    else:
+        (_, puzzle) = instance
+        ret = {"puzzle": puzzle}
+
+    start_time = time.time()
+    # Any failure (a bad instance file, or conjure or savilerow missing) is
+    # reported for this instance, rather than stopping the whole batch
+    try:
+        if instance[0] == "eprime":
+            (_, solver, _) = parse_essence(eprime, param)
+        else:
+            (_, solver) = parse_json(puzzle)
+        parse_end = time.time()
+        solution = solver.solveSingle([])
+        end_time = time.time()
+    except ParseError as e:
+        ret["error"] = str(e)
+        return ret
+    except Exception as e:
+        ret["error"] = "{}: {}".format(type(e).__name__, e)
+        return ret
+
+    if solution is None:
+        ret["result"] = "unsolvable"
+    elif isinstance(solution, MultipleSolutions):
+        ret["result"] = "multiple"
+    else:
+        ret["result"] = "unique"
+    ret["solvable"] = solution is not None
+    ret["parseTime"] = parse_end - start_time
+    ret["solveTime"] = end_time - parse_end
+    return ret
+
+
+def screen_instances(instances, *, cores):
+    """
+    Check a list of instances (see screen_instance), spread over 'cores'
+    processes. Yields the results in the same order as 'instances'.
+    """
+    if cores <= 1 or os.name == "nt":
+        yield from map(screen_instance, instances)
+    else:
+        with multiprocessing.Pool(processes=cores) as pool:
+            yield from pool.imap(screen_instance, instances)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Check if puzzle instances have a unique solution"
+    )
+    parser.add_argument("--eprime", type=str, help="savilerow eprime file")
+    parser.add_argument(
+        "--puzzle",
+        action="store_true",
+        help="Instances are JSON puzzle files, rather than eprime params",
+    )
+    parser.add_argument(
+        "instances",
+        type=str,
+        nargs="+",
+        help="savilerow param files (or JSON puzzle files, with --puzzle)",
+    )
+    parser.add_argument(
+        "--cores", type=int, default=4, help="Number of CPU cores to use"
+    )
+    parser.add_argument(
+        "--output", type=str, default=None, help="File to write results to"
+    )
+    parser.add_argument(
+        "--info", action="store_true", help="Print (some) debugging info"
+    )
+
+    args = parser.parse_args()
+
+    if (args.eprime is None) == (not args.puzzle):
+        print("Must give exactly one of --eprime or --puzzle")
+        sys.exit(1)
+
+    if args.info:
+        logging.basicConfig(level=logging.INFO)
+
+    if args.puzzle:
+        instances = [("json", p) for p in args.instances]
+    else:
+        instances = [("eprime", args.eprime, p) for p in args.instances]
+
+    if args.output is None:
+        out = sys.stdout
+    else:
+        out = open(args.output, "w")
+
+    # One JSON object per line, so results can be read as they arrive
+    for result in screen_instances(instances, cores=args.cores):
+        print(json.dumps(result), file=out, flush=True)
+
+    if args.output is not None:
+        out.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,14 @@
 import copy
 import logging
+import hashlib
+import itertools
+import json
+import os
+import statistics
+import numpy
 from sortedcontainers import *
 
-from pysat.solvers import Solver
+from pysat.solvers import Solver, NoSuchSolverError
 from ..utils import chainlist, get_cpu_time, randomFromSeed
 from ..config import EXPCONFIG
 
@@ -16,25 +22,224 @@ import random
 # print(inspect.getfile(pysat))
 
 
+# The pysat backends tried when EXPCONFIG["solver"] is "autotune"
+AUTOTUNE_BACKENDS = [
+    "g3", "g4", "cadical153", "minisat22", "maplechrono", "lingeling"
+]
+
+# Which backends support a limit on propagations (CaDiCaL and Lingeling do
+# not, so solveLimited just solves with them)
+_propbudget = {}
+
+
+def supportsPropBudget(backend):
+    if backend not in _propbudget:
+        solver = Solver(name=backend, bootstrap_with=[[1]])
+        try:
+            solver.prop_budget(1)
+            solver.solve_limited()
+            _propbudget[backend] = True
+        except NotImplementedError:
+            _propbudget[backend] = False
+        solver.delete()
+    return _propbudget[backend]
+
+
+# Which backends support unit propagation without search (Lingeling does not)
+_propagate = {}
+
+
+def supportsPropagate(backend):
+    if backend not in _propagate:
+        solver = Solver(name=backend, bootstrap_with=[[1]])
+        try:
+            solver.propagate()
+            _propagate[backend] = True
+        except NotImplementedError:
+            _propagate[backend] = False
+        solver.delete()
+    return _propagate[backend]
+
+
+# Identify a CNF, so autotune results can be reused
+def cnfFingerprint(clauses):
+    flat = numpy.fromiter(
+        itertools.chain.from_iterable((*c, 0) for c in clauses), dtype=numpy.int32
+    )
+    return hashlib.sha1(flat.tobytes()).hexdigest()
+
+
+# Map from CNF fingerprint to the backend autotune chose for it, which is
+# also stored in the file EXPCONFIG["autotuneCache"], if that is set
+_autotunecache = None
+
+
+def autotuneCache():
+    global _autotunecache
+    if _autotunecache is None:
+        _autotunecache = {}
+        filename = EXPCONFIG["autotuneCache"]
+        if filename is not None and os.path.exists(filename):
+            with open(filename) as f:
+                _autotunecache = json.load(f)
+    return _autotunecache
+
+
+def saveAutotuneCache():
+    filename = EXPCONFIG["autotuneCache"]
+    if filename is not None:
+        with open(filename, "w") as f:
+            json.dump(autotuneCache(), f, indent=1)
+
+
+# Number of SATRecorders this process has created, to give each its own file
+_recordercount = 0
+
+
+class BudgetController:
+    """
+    Chooses the propagation budget used by solveLimited, separately for
+    each phase of MUS finding. Every WINDOW queries in a phase, the budget
+    is doubled if more than RAISE_RATE of them ran out of budget (which
+    makes MUSes larger), or lowered to twice the most propagations any of
+    them needed if none ran out (so hopeless queries give up sooner).
+
+    Worker processes each get a copy of the controller when they are
+    forked. They send back what they learnt with takeDelta, which the
+    parent combines with merge.
+    """
+
+    WINDOW = 100
+    RAISE_RATE = 0.02
+    MIN_BUDGET = 1000
+
+    def __init__(self, budget, maxbudget):
+        self._initial = budget
+        self._max = maxbudget
+        self._budgets = {}
+        # Phases whose budget changed since the last takeDelta
+        self._changed = set()
+        # For each phase: [queries, undecided queries, max propagations,
+        # solve time, solve time of undecided queries]
+        self._windows = {}
+        self.phase = None
+
+    def budget(self):
+        return self._budgets.get(self.phase, self._initial)
+
+    def record(self, propagations, decided, time):
+        window = self._windows.setdefault(self.phase, [0, 0, 0, 0, 0])
+        window[0] += 1
+        window[3] += time
+        if decided:
+            window[2] = max(window[2], propagations)
+        else:
+            window[1] += 1
+            window[4] += time
+        self._adapt(self.phase)
+
+    # Change the budget of 'phase' if its window is full
+    def _adapt(self, phase):
+        window = self._windows[phase]
+        if window[0] < self.WINDOW:
+            return
+        (queries, undecided, maxprops, alltime, undecidedtime) = window
+        old = self._budgets.get(phase, self._initial)
+        if undecided > self.RAISE_RATE * queries:
+            new = min(old * 2, self._max)
+        elif undecided == 0:
+            new = max(min(old, maxprops * 2), self.MIN_BUDGET)
+        else:
+            new = old
+        if new != old:
+            logging.debug(
+                "Budget %s: %s -> %s (%s/%s undecided, %.3f/%.3f secs)",
+                phase, old, new, undecided, queries, undecidedtime, alltime,
+            )
+            self._budgets[phase] = new
+            self._changed.add(phase)
+        del self._windows[phase]
+
+    # The budgets changed and the queries recorded since the last call,
+    # which are then forgotten (so they are only ever reported once)
+    def takeDelta(self):
+        delta = ({p: self._budgets[p] for p in self._changed}, self._windows)
+        self._changed = set()
+        self._windows = {}
+        return delta
+
+    # Add in the deltas (from takeDelta) of worker processes. Where any
+    # worker changed the budget of a phase, the biggest new budget is used
+    # and the phase starts a new window. Otherwise the queries of every
+    # worker are added to the phase's window.
+    def merge(self, deltas):
+        changed = {}
+        for (budgets, _) in deltas:
+            for (phase, budget) in budgets.items():
+                changed[phase] = max(budget, changed.get(phase, 0))
+        for (phase, budget) in changed.items():
+            self._budgets[phase] = budget
+            self._changed.add(phase)
+            self._windows.pop(phase, None)
+        for (_, windows) in deltas:
+            for (phase, theirs) in windows.items():
+                if phase in changed:
+                    continue
+                window = self._windows.setdefault(phase, [0, 0, 0, 0, 0])
+                for i in (0, 1, 3, 4):
+                    window[i] += theirs[i]
+                window[2] = max(window[2], theirs[2])
+                self._adapt(phase)
+
+
 class SATSolver:
     def __init__(self, cnf=None):
+        # With autotune, use g4 until autotune is called
+        if EXPCONFIG["solver"] == "autotune":
+            self._backend = "g4"
+        else:
+            self._backend = EXPCONFIG["solver"]
         if cnf is None:
-            self._solver = Solver(name=EXPCONFIG["solver"], incr=EXPCONFIG["solverIncremental"])
+            self._solver = Solver(name=self._backend, incr=EXPCONFIG["solverIncremental"])
             self._boolcount = 1
             self._clauses = []
         else:
-            self._boolcount = cnf.nv
-            self._solver = Solver(name=EXPCONFIG["solver"], incr=EXPCONFIG["solverIncremental"],
+            self._boolcount = cnf.nv + 1
+            self._solver = Solver(name=self._backend, incr=EXPCONFIG["solverIncremental"],
                                   bootstrap_with=cnf.clauses)
             self._clauses = cnf.clauses
 
-        self._stack = []
         self._boolnames = {}
-        self._knownlits = SortedSet()
+        # All literals we know (as a set, and in the order they were added),
+        # and the ones which still have to be passed as an assumption (all
+        # of them, unless knownLitsAsClauses). _assumelits is a dict, used
+        # as an ordered set.
+        self._knownlits = set()
+        self._knowntrail = []
+        self._assumelits = {}
+        # For each push, the length of _knowntrail when it was done
+        self._stack = []
+        # Known literals which have been added to the solver as unit clauses
+        self._unitlits = []
+        self._unitssincesimplify = 0
         if EXPCONFIG["dumpSAT"]:
             assert (cnf is None)
             self._rawclauses = []
         self._lasttime = -1
+        self._reboots = 0
+        self._rebootpending = False
+        self._basecost = None
+        # Clauses added by addGuardedClause which have not been removed
+        self._guarded = {}
+        # Preferred values of variables, kept so they survive a reboot
+        self._phases = []
+        # Where SAT queries are recorded (see _getRecorder)
+        self._recorder = None
+        self._recorderpid = None
+        self._startRebootWindow()
+        self._budget = BudgetController(
+            EXPCONFIG["solveLimitedBudget"], EXPCONFIG["solveLimitedMaxBudget"]
+        )
 
         self.reset_stats()
 
@@ -54,32 +259,169 @@ class SATSolver:
         self._clauses.append(clause)
         if EXPCONFIG["dumpSAT"]:
             self._rawclauses.append(clause)
-        self._solver.add_clause(clause)
+        self._addClause(clause)
 
     def addImplies(self, var, clauses):
         for c in clauses:
             self._clauses.append(c + [-var])
-            self._solver.add_clause(c + [-var])
+            self._addClause(c + [-var])
             if EXPCONFIG["dumpSAT"]:
                 assert len(clauses) == 1
                 self._rawclauses.append(c)
 
+    # Make the solver try setting 'positive' literals true and 'negative'
+    # literals false first. This replaces any previous phases.
+    def set_phases(self, positive=(), negative=()):
+        self._phases = list(positive) + [-x for x in negative]
+        self._solver.set_phases(self._phases)
+
+    # Add a clause to the SAT solver (but not to _clauses)
+    def _addClause(self, clause):
+        self._solver.add_clause(clause)
+        if self._recorder is not None and self._recorderpid == os.getpid():
+            self._recorder.clause(clause)
+
+    # The SATRecorder for this process, if EXPCONFIG["recordSAT"] is set.
+    # Forked processes each open their own log, starting from the clauses
+    # the solver has when the log is opened.
+    def _getRecorder(self):
+        if EXPCONFIG["recordSAT"] is None:
+            return None
+        if self._recorder is None or self._recorderpid != os.getpid():
+            from ..satlog import SATRecorder
+
+            # A forked process closes its copy of its parent's log
+            self.closeRecorder()
+            global _recordercount
+            _recordercount += 1
+            filename = "{}-{}-{}.satlog".format(
+                EXPCONFIG["recordSAT"], os.getpid(), _recordercount
+            )
+            self._recorderpid = os.getpid()
+            self._recorder = SATRecorder(
+                filename, self._currentclauses(), self._boolcount
+            )
+        return self._recorder
+
+    # Close the log of SAT queries, if one is open. Called when the solver
+    # is garbage collected, but can be called earlier (a later query opens
+    # a new log).
+    def closeRecorder(self):
+        if self._recorder is not None:
+            self._recorder.close()
+            self._recorder = None
+
+    def __del__(self):
+        if getattr(self, "_recorder", None) is not None:
+            self.closeRecorder()
+
+    # The clauses in the SAT solver (other than learned clauses)
+    def _currentclauses(self):
+        return self._simplifiedclauses() + [
+            clause + [-act] for (act, clause) in self._guarded.items()
+        ]
+
     def __getstate__(self):
         ret = self.__dict__.copy()
         del ret['_solver']
+        ret['_recorder'] = None
         return ret
 
     def __setstate__(self, d):
         self.__dict__ = d
         self.reboot()
 
-    # Recreate solver
-    def reboot(self):
+    # Recreate solver, which throws away learned clauses. If seed is given,
+    # the clauses are shuffled, so the new solver searches differently.
+    def reboot(self, seed=None):
+        clauses = self._simplifiedclauses()
+        if seed is not None:
+            clauses = list(clauses)
+            randomFromSeed(seed).shuffle(clauses)
         self._solver = Solver(
-            name=EXPCONFIG["solver"],
+            name=self._backend,
             incr=EXPCONFIG["solverIncremental"],
-            bootstrap_with=self._clauses
+            bootstrap_with=clauses
         )
+        for (act, clause) in self._guarded.items():
+            self._solver.add_clause(clause + [-act])
+        if len(self._phases) > 0:
+            self._solver.set_phases(self._phases)
+        if self._recorder is not None and self._recorderpid == os.getpid():
+            self._recorder.base(self._currentclauses(), self._boolcount)
+        self._basecost = None
+        self._rebootpending = False
+        self._startRebootWindow()
+
+    def _startRebootWindow(self):
+        self._windowsolves = 0
+        self._windowtime = 0
+        self._windowprops = self._solver.accum_stats()["propagations"]
+
+    # Record a call to the SAT solver. With rebootPolicy, every
+    # REBOOT_WINDOW solves we measure the time per propagation, and reboot
+    # if it has grown too much since the first window after the last
+    # reboot (which happens as learned clauses pile up), or if the solver
+    # has seen too many conflicts. The reboot is done at the start of the
+    # next solve, so the model or core of this solve can still be read.
+    REBOOT_WINDOW = 500
+
+    def _recordSolve(self, time):
+        self._stats["solveCount"] += 1
+        self._stats["solveTime"] += time
+        self._lasttime = time
+        if not EXPCONFIG["rebootPolicy"]:
+            return
+        self._windowsolves += 1
+        self._windowtime += time
+        if self._windowsolves < self.REBOOT_WINDOW:
+            return
+        stats = self._solver.accum_stats()
+        cost = self._windowtime / max(stats["propagations"] - self._windowprops, 1)
+        if self._basecost is None:
+            self._basecost = cost
+        elif (
+            stats["conflicts"] > EXPCONFIG["rebootConflicts"]
+            or cost > EXPCONFIG["rebootSlowdown"] * self._basecost
+        ):
+            logging.info(
+                "Rebooting solver: %s conflicts, %s secs/propagation (was %s)",
+                stats["conflicts"], cost, self._basecost,
+            )
+            self._rebootpending = True
+            return
+        self._startRebootWindow()
+
+    def _recordResult(self, recorder, result, time):
+        core = self._solver.get_core() if result is False else []
+        recorder.result(result, core, int(time * 1e9))
+
+    def _rebootIfPending(self):
+        if self._rebootpending:
+            self._reboots += 1
+            self._stats["rebootCount"] += 1
+            self.reboot(self._reboots if EXPCONFIG["rebootSeed"] else None)
+
+    # The clauses of the problem, simplified by the known literals which
+    # have been added as unit clauses. Satisfied clauses are removed,
+    # falsified literals are removed from the remaining clauses.
+    def _simplifiedclauses(self):
+        if len(self._unitlits) == 0:
+            return self._clauses
+        units = set(self._unitlits)
+        simplified = [
+            [x for x in c if -x not in units]
+            for c in self._clauses
+            if not any(x in units for x in c)
+        ]
+        # Keep the known literals themselves, so they still appear in models
+        return simplified + [[x] for x in self._unitlits]
+
+    # Rebuild the solver from the simplified CNF
+    def simplify(self):
+        self._unitssincesimplify = 0
+        self.reboot()
+        self._stats["simplifyCount"] += 1
 
     def dumpSAT(self, filename, assume):
         assert len(assume) == 1
@@ -95,27 +437,39 @@ class SATSolver:
     # SAT assignments look like a list of integers, where:
     # '5' means variable 5 is true
     # '-5' means variable 5 is false
-    # We want a map where m[5] is true if 5 is true
-    def satassignment2map(self, l):
-        return {abs(x): x > 0 for x in l}
+    # We want a numpy array where m[5] is 1 if 5 is true, -1 if 5 is false
+    # and 0 if 5 is not assigned
+    def satassignment2array(self, l):
+        l = numpy.fromiter(l, dtype=numpy.int64, count=len(l))
+        size = self._boolcount
+        if len(l) > 0:
+            size = max(size, int(numpy.abs(l).max()) + 1)
+        m = numpy.zeros(size, dtype=numpy.int8)
+        m[numpy.abs(l)] = numpy.sign(l)
+        return m
 
     def solve(self, lits, *, getsol):
         # if multiprocessing.current_process().name == "MainProcess":
         #    print("!! solving in the main thread")
         #    traceback.print_stack()
 
+        self._rebootIfPending()
+        recorder = self._getRecorder()
+        assumptions = chainlist(lits, self._assumelits)
+        if recorder is not None:
+            recorder.solve(assumptions, None)
         start_time = get_cpu_time()
-        x = self._solver.solve(assumptions=chainlist(lits, self._knownlits))
+        x = self._solver.solve(assumptions=assumptions)
         end_time = get_cpu_time()
-        self._stats["solveCount"] += 1
-        self._stats["solveTime"] += end_time - start_time
-        self._lasttime = end_time - start_time
-        if self._lasttime > 5:
+        if recorder is not None:
+            self._recordResult(recorder, x, end_time - start_time)
+        self._recordSolve(end_time - start_time)
+        if end_time - start_time > 5:
             logging.info("Long time solve: %s %s", len(lits), end_time - start_time)
         if getsol == False:
             return x
         if x:
-            return self.satassignment2map(self._solver.get_model())
+            return self.satassignment2array(self._solver.get_model())
         else:
             return None
 
@@ -124,83 +478,240 @@ class SATSolver:
         #    print("!! solveLimited in the main thread")
         #    traceback.print_stack()
 
+        self._rebootIfPending()
+        recorder = self._getRecorder()
+        assumptions = chainlist(lits, self._assumelits)
         start_time = get_cpu_time()
-        start_stats = self._solver.accum_stats()
-        if EXPCONFIG["solveLimited"]:
-            self._solver.prop_budget(EXPCONFIG["solveLimitedBudget"])
-            x = self._solver.solve_limited(assumptions=chainlist(lits, self._knownlits))
+        limited = EXPCONFIG["solveLimited"] and supportsPropBudget(self._backend)
+        if limited:
+            adaptive = EXPCONFIG["adaptiveBudget"]
+            if adaptive:
+                start_props = self._solver.accum_stats()["propagations"]
+                budget = self._budget.budget()
+            else:
+                budget = EXPCONFIG["solveLimitedBudget"]
+            if recorder is not None:
+                recorder.solve(assumptions, budget)
+            self._solver.prop_budget(budget)
+            x = self._solver.solve_limited(assumptions=assumptions)
         else:
-            x = self._solver.solve(assumptions=chainlist(lits, self._knownlits))
+            if recorder is not None:
+                recorder.solve(assumptions, None)
+            x = self._solver.solve(assumptions=assumptions)
         end_time = get_cpu_time()
-        self._stats["solveCount"] += 1
-        self._stats["solveTime"] += end_time - start_time
-        self._lasttime = end_time - start_time
+        if recorder is not None:
+            self._recordResult(recorder, x, end_time - start_time)
+        if x is None:
+            self._stats["undecidedCount"] += 1
+            self._stats["undecidedTime"] += end_time - start_time
+        if limited and adaptive:
+            props = self._solver.accum_stats()["propagations"] - start_props
+            self._budget.record(props, x is not None, end_time - start_time)
+        self._recordSolve(end_time - start_time)
         if self._lasttime > 5:
             logging.info(
                 "Long time solveLimited: %s %s", len(lits), end_time - start_time
             )
         return x
 
+    # Unit propagate 'lits' and the known literals, without any search.
+    # Returns (False, lits) if this gives a conflict, or (True, lits)
+    # where lits are the literals set by propagation (including 'lits').
+    # Check canPropagate first, as some backends cannot propagate.
+    def canPropagate(self):
+        return supportsPropagate(self._backend)
+
+    def propagate(self, lits):
+        self._rebootIfPending()
+        start_time = get_cpu_time()
+        (ok, implied) = self._solver.propagate(
+            assumptions=chainlist(lits, self._assumelits)
+        )
+        self._stats["propagateCount"] += 1
+        self._stats["propagateTime"] += get_cpu_time() - start_time
+        return (ok, implied)
+
+    # Time each backend in AUTOTUNE_BACKENDS on 'queries' (lists of
+    # assumptions, like those given to solveLimited), and switch to the
+    # fastest. The choice is cached by the fingerprint of the CNF.
+    # Every backend is timed on 'queries' under the same limit: with
+    # solveLimited, backends which cannot be given a propagation budget are
+    # not tried, as they could only be run without one. Backends are
+    # compared first on how many queries they left undecided (which makes
+    # MUSes bigger), then on the median of autotuneRepeats timings, each
+    # with a fresh solver.
+    def autotune(self, queries):
+        clauses = self._simplifiedclauses()
+        key = cnfFingerprint(clauses)
+        cache = autotuneCache()
+        if key not in cache:
+            limited = EXPCONFIG["solveLimited"]
+            scores = {}
+            for backend in AUTOTUNE_BACKENDS:
+                try:
+                    if limited and not supportsPropBudget(backend):
+                        continue
+                except NoSuchSolverError:
+                    continue
+                times = []
+                undecided = 0
+                for _ in range(EXPCONFIG["autotuneRepeats"]):
+                    solver = Solver(name=backend, bootstrap_with=clauses)
+                    start_time = get_cpu_time()
+                    for q in queries:
+                        assume = chainlist(q, self._assumelits)
+                        if limited:
+                            solver.prop_budget(EXPCONFIG["solveLimitedBudget"])
+                            x = solver.solve_limited(assumptions=assume)
+                        else:
+                            x = solver.solve(assumptions=assume)
+                        if x is None:
+                            undecided += 1
+                        elif x is False:
+                            solver.get_core()
+                    times.append(get_cpu_time() - start_time)
+                    solver.delete()
+                scores[backend] = (undecided, statistics.median(times))
+            logging.info("Autotune scores: %s", scores)
+            cache[key] = min(scores, key=scores.get)
+            saveAutotuneCache()
+        logging.info("Autotune chose %s", cache[key])
+        if cache[key] != self._backend:
+            self._backend = cache[key]
+            self.reboot()
+
+    # Returns [] if there is no solution, [sol] if there is exactly one
+    # solution and [sol, othersol] if there is more than one, where
+    # othersol differs from sol on some variable in puzlits
     def solveSingle(self, puzlits, lits):
-        # if multiprocessing.current_process().name == "MainProcess":
-        #    print("!! solveSingle in the main thread")
-        # We just brute force check all assignments to other variables
         sol = self.solve(lits, getsol=True)
         if sol is None:
             return []
-        for p in puzlits:
-            if sol[p]:
-                extrasol = self.solve(chainlist(lits, [-p]), getsol=False)
-                if extrasol:
-                    return [sol, self.solve(chainlist(lits, [-p]), getsol=True)]
-            else:
-                extrasol = self.solve(chainlist(lits, [p]), getsol=False)
-                if extrasol:
-                    return [sol, self.solve(chainlist(lits, [p]), getsol=True)]
-        return [sol]
+        # Block 'sol', so any other solution must change some variable
+        act = self.addGuardedClause([-p if sol[p] > 0 else p for p in puzlits])
+        othersol = self.solve(chainlist(lits, [act]), getsol=True)
+        self.removeGuardedClause(act)
+        if othersol is None:
+            return [sol]
+        return [sol, othersol]
 
+    # Find the values of puzlits which are the same in every solution (the
+    # backbone), or None if there is no solution.
+    # Each candidate literal starts with its value in some solution. We then
+    # look for a solution which flips at least one of a chunk of candidates:
+    # if there is one, every candidate it flips is not in the backbone,
+    # otherwise the whole chunk is.
     def solveAll(self, puzlits, lits):
-        # if multiprocessing.current_process().name == "MainProcess":
-        #    print("!! solveSingle in the main thread")
-        # We just brute force check all assignments to other variables
-        sol = {}
-        for p in puzlits:
-            pos = self.solve(chainlist(lits, [p]), getsol=False)
-            neg = self.solve(chainlist(lits, [-p]), getsol=False)
-            if not (pos and neg):
-                if pos:
-                    sol[p] = True
-                else:
-                    sol[p] = False
-        return sol
+        sol = self.solve(lits, getsol=True)
+        if sol is None:
+            return None
+        puzlits = numpy.fromiter(puzlits, dtype=numpy.int64, count=len(puzlits))
+        candidates = puzlits * sol[puzlits]
+        backbone = []
+        chunksize = EXPCONFIG["backboneChunkSize"]
+        while len(candidates) > 0:
+            chunk = candidates[:chunksize].tolist()
+            act = self.addGuardedClause([-c for c in chunk])
+            model = self.solve(chainlist(lits, backbone, [act]), getsol=True)
+            self.removeGuardedClause(act)
+            if model is None:
+                backbone.extend(chunk)
+                candidates = candidates[chunksize:]
+            else:
+                keep = model[numpy.abs(candidates)] == numpy.sign(candidates)
+                candidates = candidates[keep]
+        logging.info("Backbone: %s of %s literals", len(backbone), len(puzlits))
+        return self.satassignment2array(backbone)
+
+    # Add a clause which is only active when the returned variable is
+    # assumed. These clauses are only kept until they are removed.
+    def addGuardedClause(self, clause):
+        act = self.Bool("guard")
+        self._guarded[act] = list(clause)
+        self._addClause(list(clause) + [-act])
+        return act
+
+    def removeGuardedClause(self, act):
+        del self._guarded[act]
+        self._addClause([-act])
+
+    # The clauses the solver was built from (not including known literals
+    # or guarded clauses)
+    def clauses(self):
+        return self._clauses
+
+    # Returns the model from the last (satisfiable) solve, in pysat's format
+    def get_model(self):
+        return self._solver.get_model()
 
     # Returns unsat_core from last solve
     def unsat_core(self):
-        core = [x for x in self._solver.get_core() if x not in self._knownlits]
+        core = [x for x in self._solver.get_core() if x not in self._assumelits]
         # logging.info("Core size: %s", len(core))
         return core
 
     def push(self):
-        self._stack.append(copy.deepcopy(self._knownlits))
+        self._stack.append(len(self._knowntrail))
 
+    # Forget the literals added since the matching push
     def pop(self):
-        self._knownlits = self._stack.pop()
+        mark = self._stack.pop()
+        for var in self._knowntrail[mark:]:
+            self._knownlits.remove(var)
+            self._assumelits.pop(var, None)
+        del self._knowntrail[mark:]
 
     def addLit(self, var):
         # We used to check this, but now one high-level variable can be named with multiple lits
         # assert var not in self._knownlits
         if var not in self._knownlits:
             self._knownlits.add(var)
+            self._knowntrail.append(var)
+            # Literals added inside a push are only assumed, as unit clauses
+            # cannot be removed again by pop
+            if EXPCONFIG["knownLitsAsClauses"] and len(self._stack) == 0:
+                self._addClause([var])
+                self._unitlits.append(var)
+                self._unitssincesimplify += 1
+                if self._unitssincesimplify == EXPCONFIG["simplifyEvery"]:
+                    self.simplify()
+            else:
+                self._assumelits[var] = None
+
+    # Tell the budget controller which part of MUS finding we are in
+    def set_phase(self, phase):
+        self._budget.phase = phase
 
     def reset_stats(self):
         self._stats = {
             "solveCount": 0,
-            "solveTime": 0
+            "solveTime": 0,
+            "simplifyCount": 0,
+            "undecidedCount": 0,
+            "undecidedTime": 0,
+            "rebootCount": 0,
+            "propagateCount": 0,
+            "propagateTime": 0
         }
 
     def get_stats(self):
         return self._stats
 
     def add_stats(self, d):
-        self._stats["solveCount"] += d["solveCount"]
-        self._stats["solveTime"] += d["solveTime"]
+        for k in self._stats:
+            self._stats[k] += d[k]
+
+    # What this solver has learnt about tuning itself (the budgets of the
+    # BudgetController and, once measured, the time per propagation the
+    # reboot policy compares against) since the last call. Worker
+    # processes send this back, so it is not lost when they exit.
+    def take_tuning(self):
+        return {"budget": self._budget.takeDelta(), "basecost": self._basecost}
+
+    # Add in the take_tuning results of worker processes
+    def add_tuning(self, tunings):
+        self._budget.merge([t["budget"] for t in tunings])
+        if self._basecost is None:
+            costs = [t["basecost"] for t in tunings if t["basecost"] is not None]
+            if len(costs) > 0:
+                self._basecost = min(costs)
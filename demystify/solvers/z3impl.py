@@ -28,6 +28,13 @@ class Z3Solver:
             con = z3.And(clauses)
         self._solver.add(z3.Implies(var, con))
 
+    # Z3 does not let us choose phases
+    def set_phases(self, positive=(), negative=()):
+        pass
+
+    def canPropagate(self):
+        return False
+
     def solve(self, lits, *, getsol):
         self._stats["solveCount"] += 1
         result = self._solver.check(list(lits))
@@ -95,3 +102,10 @@ class Z3Solver:
     def add_stats(self, d):
         self._stats["solveCount"] += d["solveCount"]
         self._stats["solveTime"] += d["solveTime"]
+
+    # Z3 does not tune itself
+    def take_tuning(self):
+        return None
+
+    def add_tuning(self, tunings):
+        pass
@@ -103,6 +103,40 @@ def get_cpu_time():
 import numpy
 
 
+# Build a compressed sparse row (CSR) representation of a list of
+# (row, col) pairs, as two arrays: row i is indices[indptr[i]:indptr[i+1]].
+# Within each row, columns appear in the order they were given.
+def buildcsr(rows, cols, nrows):
+    rows = numpy.asarray(rows, dtype=numpy.int64)
+    cols = numpy.asarray(cols, dtype=numpy.int64)
+    order = numpy.argsort(rows, kind="stable")
+    indptr = numpy.zeros(nrows + 1, dtype=numpy.int64)
+    numpy.cumsum(numpy.bincount(rows, minlength=nrows), out=indptr[1:])
+    return (indptr, cols[order])
+
+
+# Concatenate the given rows of a CSR matrix, without a Python loop
+def csrgather(indptr, indices, rows):
+    starts = indptr[rows]
+    lens = indptr[rows + 1] - starts
+    total = lens.sum()
+    if total == 0:
+        return numpy.zeros(0, dtype=indices.dtype)
+    # Offset of the start of each row in the output
+    offsets = numpy.cumsum(lens) - lens
+    pos = numpy.repeat(starts - offsets, lens) + numpy.arange(total)
+    return indices[pos]
+
+
+# The distinct entries in the given rows of a CSR matrix with 'ncols'
+# columns, in sorted order. This is numpy.unique(csrgather(...)), but
+# faster when rows share many entries.
+def csrunion(indptr, indices, rows, ncols):
+    mask = numpy.zeros(ncols, dtype=bool)
+    mask[csrgather(indptr, indices, rows)] = True
+    return numpy.flatnonzero(mask)
+
+
 def randomFromSeed(seed):
     if isinstance(seed, str):
         seed = [ord(c) for c in seed]